@@ -0,0 +1,41 @@
+import json
+import sys
+
+# Relative slowdown beyond which a measurement is reported as a regression
+THRESHOLD = 0.1
+
+
+def measurements(results):
+    # Flatten each run into (products, measurement) keys, where larger values
+    # are always worse
+    for run in results["runs"]:
+        yield (run["products"], "build duration"), run["build"]["duration"]
+        for endpoint, summary in run["endpoints"].items():
+            yield (run["products"], f"{endpoint} p95"), summary["latency_p95"]
+
+
+def compare(baseline, candidate, threshold=THRESHOLD):
+    baseline = dict(measurements(baseline))
+    regressions = []
+    for key, value in measurements(candidate):
+        if key not in baseline:
+            continue
+        change = value / baseline[key] - 1
+        products, measurement = key
+        print(f"{products} products, {measurement}: {change:+.1%}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+if __name__ == "__main__":
+    # Usage: python -m benchmarks.compare baseline.json candidate.json
+    with open(sys.argv[1]) as f:
+        baseline = json.load(f)
+    with open(sys.argv[2]) as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate)
+    if regressions:
+        print(f"{len(regressions)} measurements regressed by over {THRESHOLD:.0%}")
+        sys.exit(1)
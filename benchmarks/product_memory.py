@@ -0,0 +1,28 @@
+import sys
+import tracemalloc
+
+from benchmarks.synthetic import generate_hierarchy
+from web.models.product import Product
+
+
+def measure(count):
+    hierarchy = list(generate_hierarchy(count))
+
+    tracemalloc.start()
+    products = [
+        Product(
+            id=product["id"],
+            name=product["product"],
+            frequency=product["recipe_count"],
+            nutrition=product["nutrition"],
+        )
+        for product in hierarchy
+    ]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(products)} products: {allocated / count:.0f} bytes/product")
+
+
+if __name__ == "__main__":
+    measure(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
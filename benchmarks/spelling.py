@@ -0,0 +1,66 @@
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+
+from web.spelling import SpellingIndex
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def generate_vocabulary(count, seed=0):
+    generator = random.Random(seed)
+    vocabulary = {}
+    while len(vocabulary) < count:
+        syllables = generator.randint(2, 5)
+        word = "".join(
+            generator.choice(CONSONANTS) + generator.choice(VOWELS)
+            for _ in range(syllables)
+        )
+        vocabulary[word] = int(generator.paretovariate(1.2))
+    return vocabulary
+
+
+def misspell(word, generator):
+    # Apply a single deletion, insertion, substitution or transposition
+    start = generator.randrange(len(word) - 1)
+    end, after = start + 1, start + 2
+    letter = generator.choice("abcdefghijklmnopqrstuvwxyz")
+    edits = [
+        word[:start] + word[end:],
+        word[:start] + letter + word[start:],
+        word[:start] + letter + word[end:],
+        word[:start] + word[end] + word[start] + word[after:],
+    ]
+    return generator.choice(edits)
+
+
+def measure(count, lookups=10000, seed=0):
+    vocabulary = generate_vocabulary(count, seed)
+
+    tracemalloc.start()
+    started = perf_counter()
+    index = SpellingIndex(vocabulary)
+    duration = perf_counter() - started
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    generator = random.Random(seed)
+    words = generator.choices(list(vocabulary), k=lookups)
+    queries = [misspell(word, generator) for word in words]
+    started = perf_counter()
+    for query in queries:
+        index.lookup(query)
+    latency = (perf_counter() - started) / lookups
+
+    print(
+        f"{count} words: built in {duration:.2f}s, "
+        f"{allocated / 2**20:.1f} MiB ({allocated / count:.0f} bytes/word), "
+        f"{latency * 1e6:.1f}us/lookup"
+    )
+
+
+if __name__ == "__main__":
+    for count in [int(count) for count in sys.argv[1:]] or [1000, 10000, 50000]:
+        measure(count)
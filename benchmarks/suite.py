@@ -0,0 +1,162 @@
+import json
+import platform
+import random
+import subprocess
+import sys
+import tracemalloc
+from datetime import UTC, datetime
+from statistics import quantiles
+from time import perf_counter
+
+from benchmarks.synthetic import (
+    generate_directions,
+    generate_hierarchy,
+    generate_ingredients,
+    generate_products,
+    generate_recipes,
+)
+from web.app import app
+from web.batch import batches
+from web.models.product_graph import ProductGraph
+from web.refresh import GraphState, versions
+
+PRODUCT_COUNTS = (1000, 10000, 50000)
+BATCH_SIZES = (1, 10, 100, 1000)
+DESCRIPTIONS = 2000
+PRODUCT_LOOKUPS = 1000
+
+
+def latency_summary(latencies, items):
+    # Latencies are per request, and throughput is items processed per second
+    # across all requests
+    if len(latencies) > 1:
+        percentiles = quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    return {
+        "requests": len(latencies),
+        "items": items,
+        "throughput": items / sum(latencies),
+        "latency_p50": p50,
+        "latency_p95": p95,
+        "latency_p99": p99,
+    }
+
+
+def measure_build(count, seed):
+    started = perf_counter()
+    graph = ProductGraph(generate_products(count, seed))
+    duration = perf_counter() - started
+
+    # Memory is measured during a separate build, since tracing allocations
+    # slows the build; unlike the resident set size of the process, traced
+    # allocations are comparable between runs within a process
+    tracemalloc.start()
+    traced = ProductGraph(generate_products(count, seed))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    return graph, {
+        "duration": duration,
+        "products_per_second": count / duration,
+        "peak_allocated_bytes": peak,
+        "retained_bytes": retained,
+    }
+
+
+def measure_queries(client, path, descriptions, batch_size):
+    latencies = []
+    for batch in batches(descriptions, batch_size):
+        started = perf_counter()
+        response = client.post(path, json={"descriptions": batch})
+        latencies.append(perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return latency_summary(latencies, len(descriptions))
+
+
+def measure_nutrition(client, recipes, batch_size):
+    latencies = []
+    for batch in batches(recipes, batch_size):
+        started = perf_counter()
+        response = client.post("/nutrition/aggregate", json=batch)
+        latencies.append(perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return latency_summary(latencies, len(recipes))
+
+
+def measure_products(client, product_ids):
+    latencies = []
+    for product_id in product_ids:
+        started = perf_counter()
+        response = client.get(f"/products/{product_id}")
+        latencies.append(perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return latency_summary(latencies, len(product_ids))
+
+
+def run(count, seed=0):
+    print(f"Benchmarking {count} products")
+    graph, build = measure_build(count, seed)
+
+    # Serve the synthetic graph directly; each measurement uses a new graph
+    # version, so that the result cache does not carry over between them
+    client = app.test_client()
+    hierarchy = list(generate_hierarchy(count, seed))
+    ingredients = list(generate_ingredients(hierarchy, DESCRIPTIONS, seed))
+    directions = list(generate_directions(DESCRIPTIONS, seed))
+    product_ids = random.Random(seed).sample(
+        [product["id"] for product in hierarchy], min(count, PRODUCT_LOOKUPS)
+    )
+    recipes = list(generate_recipes(hierarchy, DESCRIPTIONS, seed))
+
+    def serve():
+        app.graph_refresher.state = GraphState(
+            graph=graph, loaded_at=datetime.now(tz=UTC), version=next(versions)
+        )
+
+    queries = {"/ingredients/query": ingredients, "/directions/query": directions}
+    endpoints = {}
+    for path, descriptions in queries.items():
+        for batch_size in BATCH_SIZES:
+            serve()
+            print(f"- {path} with batches of {batch_size}")
+            endpoints[f"{path}?batch_size={batch_size}"] = measure_queries(
+                client, path, descriptions, batch_size
+            )
+    for batch_size in BATCH_SIZES:
+        serve()
+        print(f"- /nutrition/aggregate with batches of {batch_size}")
+        endpoints[f"/nutrition/aggregate?batch_size={batch_size}"] = measure_nutrition(
+            client, recipes, batch_size
+        )
+    serve()
+    endpoints["/products/<id>"] = measure_products(client, product_ids)
+
+    return {"products": count, "build": build, "endpoints": endpoints}
+
+
+def environment():
+    commit = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+    ).stdout.strip()
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": datetime.now(tz=UTC).isoformat(),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python -m benchmarks.suite results.json [product counts...]
+    output = sys.argv[1] if len(sys.argv) > 1 else "benchmark-results.json"
+    counts = [int(count) for count in sys.argv[2:]] or PRODUCT_COUNTS
+
+    results = {"environment": environment(), "runs": []}
+    for count in counts:
+        results["runs"].append(run(count))
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
@@ -0,0 +1,178 @@
+import random
+
+from web.loader import CACHE_PATHS, load_queries
+from web.models.product import Product
+
+ADJECTIVES = [
+    "red",
+    "green",
+    "yellow",
+    "black",
+    "white",
+    "smoked",
+    "dried",
+    "fresh",
+    "frozen",
+    "ground",
+    "sweet",
+    "wild",
+    "baby",
+    "plain",
+    "salted",
+    "unsalted",
+    "roasted",
+    "toasted",
+    "pickled",
+    "canned",
+    "firm",
+    "soft",
+    "light",
+    "dark",
+    "whole",
+    "organic",
+]
+NOUNS = [
+    "almond",
+    "apricot",
+    "basil",
+    "bean",
+    "bread",
+    "broccoli",
+    "butter",
+    "cabbage",
+    "carrot",
+    "cheese",
+    "chickpea",
+    "chili",
+    "chocolate",
+    "coconut",
+    "cream",
+    "cumin",
+    "egg",
+    "flour",
+    "garlic",
+    "ginger",
+    "honey",
+    "lentil",
+    "lemon",
+    "lime",
+    "milk",
+    "mushroom",
+    "mustard",
+    "noodle",
+    "oat",
+    "olive",
+    "onion",
+    "paprika",
+    "parsley",
+    "pasta",
+    "pea",
+    "peanut",
+    "pepper",
+    "potato",
+    "rice",
+    "salsa",
+    "sesame",
+    "spinach",
+    "stock",
+    "sugar",
+    "tofu",
+    "tomato",
+    "vinegar",
+    "walnut",
+    "yogurt",
+]
+MODIFIERS = ["bell", "cherry", "sauce", "paste", "powder", "seed", "oil", "leaf"]
+QUANTITIES = ["1", "2", "3", "1/2", "250", "400", "a pinch of", "a handful of"]
+UNITS = ["", "g", "ml", "cups", "tbsp", "tsp", "can of", "block of"]
+PREPARATIONS = ["", "diced", "chopped", "minced", "sliced", "rinsed and drained"]
+ASIDES = ["", "(optional)", "(roughly one cup)", "[to taste]", "(see note)"]
+METHODS = ["heat", "stir", "whisk", "fold", "simmer", "bake", "fry", "blend"]
+
+
+def product_name(generator):
+    words = generator.sample(ADJECTIVES, generator.choice([0, 0, 1, 1, 1, 2]))
+    words.append(generator.choice(NOUNS))
+    if generator.random() < 0.2:
+        words.append(generator.choice(MODIFIERS))
+    return " ".join(words)
+
+
+def generate_hierarchy(count, seed=0):
+    # Products have distinct identifiers, but names may repeat, as they do in
+    # the source hierarchy; frequencies follow a long-tailed distribution
+    generator = random.Random(seed)
+    for index in range(count):
+        name = product_name(generator)
+        yield {
+            "id": f"{name.replace(' ', '_')}_{index}",
+            "product": name,
+            "recipe_count": int(generator.paretovariate(1.2)),
+            "nutrition": {
+                "protein": generator.uniform(0, 30),
+                "protein_units": "g",
+                "fat": generator.uniform(0, 30),
+                "fat_units": "g",
+                "carbohydrates": generator.uniform(0, 30),
+                "carbohydrates_units": "g",
+                "energy": generator.uniform(0, 900),
+                "energy_units": "kcal",
+                "fibre": generator.uniform(0, 10),
+                "fibre_units": "g",
+            },
+        }
+
+
+def generate_products(count, seed=0):
+    for product in generate_hierarchy(count, seed):
+        yield Product(
+            id=product["id"],
+            name=product["product"],
+            frequency=product["recipe_count"],
+            nutrition=product["nutrition"],
+        )
+
+
+def generate_ingredients(hierarchy, count, seed=0):
+    generator = random.Random(seed)
+    names = [product["product"] for product in hierarchy]
+    for _ in range(count):
+        parts = [
+            generator.choice(QUANTITIES),
+            generator.choice(UNITS),
+            generator.choice(names),
+            generator.choice(PREPARATIONS),
+            generator.choice(ASIDES),
+        ]
+        yield " ".join(part for part in parts if part)
+
+
+def generate_recipes(hierarchy, count, seed=0):
+    # Recipes are lists of (product id, quantity in grams) pairs
+    generator = random.Random(seed)
+    product_ids = [product["id"] for product in hierarchy]
+    for _ in range(count):
+        ingredients = generator.sample(product_ids, min(len(product_ids), 8))
+        yield {
+            "ingredients": [
+                [product_id, generator.choice([5, 50, 100, 250, 400])]
+                for product_id in ingredients
+            ]
+        }
+
+
+def generate_directions(count, seed=0):
+    generator = random.Random(seed)
+    equipment = [
+        query
+        for category in ("appliance_queries", "utensil_queries", "vessel_queries")
+        for query in load_queries(CACHE_PATHS[category])
+    ]
+    for _ in range(count):
+        method = generator.choice(METHODS)
+        ingredient = generator.choice(NOUNS)
+        vessel, utensil = generator.sample(equipment, 2)
+        yield (
+            f"{method} the {ingredient} in a {vessel} "
+            f"and transfer it using the {utensil}"
+        )
@@ -0,0 +1,67 @@
+import gc
+import os
+import sys
+
+from benchmarks.synthetic import generate_products
+from web.models.product_graph import ProductGraph
+
+WORKERS = 2
+
+
+def memory_usage(pid):
+    # Return the resident memory of a process that is shared with others, and
+    # that is private to it, in bytes
+    sizes = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, value, *_ = line.split()
+            if value.isdigit():
+                sizes[field.rstrip(":")] = int(value) * 1024
+    shared = sizes["Shared_Clean"] + sizes["Shared_Dirty"]
+    private = sizes["Private_Clean"] + sizes["Private_Dirty"]
+    return shared, private
+
+
+def run_worker(ready, release):
+    # Allocate and collect garbage, as the handling of requests does; each
+    # collection traverses the objects that are tracked by the collector
+    for _ in range(3):
+        garbage = [{"item": [item]} for item in range(100000)]
+        del garbage
+        gc.collect()
+    os.write(ready, b"\n")
+    os.read(release, 1)
+    os._exit(0)
+
+
+def measure(label):
+    # Fork workers from this process, as gunicorn does from its arbiter, and
+    # measure their memory once each has run a few garbage collections
+    workers = []
+    for _ in range(WORKERS):
+        (ready_r, ready_w), (release_r, release_w) = os.pipe(), os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            run_worker(ready_w, release_r)
+        os.read(ready_r, 1)
+        workers.append((pid, release_w))
+
+    for pid, release in workers:
+        shared, private = memory_usage(pid)
+        print(
+            f"{label}: worker shares {shared / 2**20:.0f} MiB, "
+            f"{private / 2**20:.0f} MiB private"
+        )
+    for pid, release in workers:
+        os.write(release, b"\n")
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    graph = ProductGraph(generate_products(count))
+    gc.collect()
+
+    measure(f"{count} products")
+    gc.freeze()
+    measure(f"{count} products, frozen")
@@ -5,4 +5,6 @@ from web.app import app
 
 @pytest.fixture
 def client():
+    app.graph_refresher.state = None
+    app.graph_refresher.failures = None
     return app.test_client()
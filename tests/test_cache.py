@@ -0,0 +1,41 @@
+from web.cache import LRUCache, StemCache
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_stem_cache_bound():
+    stems = StemCache(str.upper, maxsize=1)
+    stems.seed(["onion"])
+
+    assert stems.stem("onion") == "ONION"
+    assert stems.stem("tofu") == "TOFU"
+    assert stems.stems == {"onion": "ONION"}
+    assert stems.stats()["hit_rate"] == 1 / 3
+
+
+def test_cache_statistics(client):
+    response = client.get("/caches")
+
+    assert response.json.keys() == {
+        "ingredient_results",
+        "product_stems",
+        "equipment_stems",
+    }
@@ -1,21 +1,26 @@
+from web.directions import query_direction
+from web.matching import analyze
+
+
 def test_description_parsing(client):
     description_markup = {
         "Pre-heat the oven to 250 degrees F.": (
-            'Pre-heat the <mark class="equipment appliance">oven</mark> '
-            "to 250 degrees F."
+            '<mark class="verb action">Pre-heat</mark> the '
+            '<mark class="equipment appliance">oven</mark> to 250 degrees F.'
         ),
         "leave the Slow cooker on a low heat": (
-            "leave the "
-            # TODO '<mark class="verb action">leave</mark> the '
+            '<mark class="verb action">leave</mark> the '
             '<mark class="equipment appliance">Slow cooker</mark> '
             "on a low heat"
         ),
         "place casserole dish in oven": (
-            'place <mark class="equipment vessel">casserole dish</mark> '
+            '<mark class="verb action">place</mark> '
+            '<mark class="equipment vessel">casserole dish</mark> '
             'in <mark class="equipment appliance">oven</mark>'
         ),
         "empty skewer into the karahi": (
-            'empty <mark class="equipment utensil">skewer</mark> into the '
+            '<mark class="verb action">empty</mark> '
+            '<mark class="equipment utensil">skewer</mark> into the '
             '<mark class="equipment vessel">karahi</mark>'
         ),
     }
@@ -38,3 +43,70 @@ def test_description_parsing(client):
         entity_names = [entity["name"] for entity in result["entities"]]
         assert description in description_entities
         assert entity_names == description_entities[description]
+
+
+def test_json_request(client):
+    response = client.post(
+        "/directions/query", json={"descriptions": ["place casserole dish in oven"]}
+    )
+
+    assert [entity["name"] for entity in response.json[0]["entities"]] == [
+        "oven",
+        "casserole dish",
+    ]
+
+
+def test_listed_nouns_are_not_verbs(client):
+    # Ingredient lists include nouns that share their names with verbs
+    description_markup = {
+        "Combine flour, sugar, cream and zest": (
+            '<mark class="verb action">Combine</mark> flour, sugar, cream and zest'
+        ),
+        "Serve with noodles, pickle and top": (
+            '<mark class="verb action">Serve</mark> with noodles, pickle and top'
+        ),
+        "Beat the cream, and zest the lemon": (
+            '<mark class="verb action">Beat</mark> the cream, and '
+            '<mark class="verb action">zest</mark> the lemon'
+        ),
+    }
+
+    response = client.post(
+        "/directions/query", data={"descriptions[]": list(description_markup.keys())}
+    )
+
+    for result in response.json:
+        assert result["markup"] == description_markup[result["description"]]
+
+
+def test_equipment_is_not_verbs(client):
+    # Equipment names can begin with words that share their stems with verbs
+    description_markup = {
+        "Frying pan over medium heat, then add oil": (
+            '<mark class="equipment vessel">Frying pan</mark> over medium heat, '
+            'then <mark class="verb action">add</mark> oil'
+        ),
+        "Bring the water to a boil in a roasting pan": (
+            '<mark class="verb action">Bring</mark> the water to a boil in a '
+            '<mark class="equipment vessel">roasting pan</mark>'
+        ),
+    }
+
+    response = client.post(
+        "/directions/query", data={"descriptions[]": list(description_markup.keys())}
+    )
+
+    for result in response.json:
+        assert result["markup"] == description_markup[result["description"]]
+        assert result["entities"][0]["type"] == "equipment"
+
+
+def test_verbs_overlapping_equipment():
+    description = "Frying pan over medium heat"
+    tokens = list(analyze(description))
+
+    result = query_direction(0, description, tokens, [(0, 6, "Frying")])
+
+    assert result["markup"] == (
+        '<mark class="equipment vessel">Frying pan</mark> over medium heat'
+    )
@@ -1,6 +1,10 @@
+import json
 from unittest.mock import patch
+from urllib.error import HTTPError
 
+from web.ingredients import load_product_graph
 from web.models.product import Product
+from web.models.product_graph import ProductGraph
 
 
 @patch("web.ingredients.retrieve_hierarchy")
@@ -87,3 +91,166 @@ def test_ingredient_query(stopwords, hierarchy, client):
         assert results[query]["product"]["id"] == expected["product_id"]
         assert results[query]["product"]["product"] == expected["product"]
         assert results[query]["query"]["markup"] == expected["markup"]
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_candidate_pruning(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [
+        Product(id="tofu", name="tofu", frequency=20),
+        Product(id="tofu_block", name="tofu", frequency=10),
+        Product(id="smoked_tofu", name="smoked tofu", frequency=5),
+        Product(id="firm_tofu", name="firm tofu"),
+    ]
+
+    response = client.post(
+        "/ingredients/query", data={"descriptions[]": ["firm tofu", "smoked tofu"]}
+    )
+    results = response.json["results"]
+
+    assert results["firm tofu"]["product"]["id"] == "firm_tofu"
+    assert results["smoked tofu"]["product"]["id"] == "smoked_tofu"
+    assert response.headers["X-Candidates-Retrieved"] == "2"
+    assert response.headers["X-Candidates-Pruned"] == "4"
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_result_caching(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="onion", name="onion", frequency=10)]
+
+    descriptions = ["large onion, diced", "Large  Onion, diced", "tofu"]
+    first = client.post("/ingredients/query", data={"descriptions[]": descriptions})
+    second = client.post("/ingredients/query", data={"descriptions[]": descriptions})
+
+    assert first.headers["X-Cache-Hits"] == "0"
+    assert first.headers["X-Cache-Misses"] == "2"
+    assert second.headers["X-Cache-Hits"] == "3"
+    assert second.json == first.json
+
+    markup = second.json["results"]["Large  Onion, diced"]["query"]["markup"]
+    assert markup == "Large  <mark>Onion</mark>, diced"
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_ndjson_streaming(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="onion", name="onion", frequency=10)]
+
+    response = client.post(
+        "/ingredients/query",
+        data='"large onion, diced"\n{"description": "tofu"}\n',
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    assert [result["description"] for result in results] == [
+        "large onion, diced",
+        "tofu",
+    ]
+    assert results[0]["product"]["id"] == "onion"
+    assert results[1]["product"] is None
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_ndjson_invalid_lines(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="onion", name="onion", frequency=10)]
+
+    # Invalid lines are reported in place of their results
+    data = '{"name": "onion"}\n"onion"\n{"description\n42\n"tofu"\n{}\n'
+    response = client.post(
+        "/ingredients/query", data=data, content_type="application/x-ndjson"
+    )
+    results = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert ["error" in result for result in results] == [
+        True,
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+    assert results[1]["product"]["id"] == "onion"
+    assert results[4]["description"] == "tofu"
+
+
+def test_invalid_descriptions(client):
+    # Invalid JSON documents are rejected before any results are produced
+    for body in (42, {"descriptions": [1, None]}, {"descriptions": "abc"}):
+        response = client.post("/ingredients/query", json=body)
+        assert response.status_code == 400
+    response = client.post("/directions/query", json={"descriptions": "abc"})
+    assert response.status_code == 400
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_misspelt_products(stopwords, hierarchy, client):
+    stopwords.return_value = ["grated"]
+    hierarchy.return_value = [
+        Product(id="mozzarella", name="mozzarella", frequency=10),
+        Product(id="broccoli", name="broccoli", frequency=10),
+        Product(id="jalapeno", name="jalapeño", frequency=5),
+    ]
+
+    descriptions = ["grated mozarella", "1 head of Brocolli", "2 jalepenos", "gratd"]
+    response = client.post("/ingredients/query", data={"descriptions[]": descriptions})
+    results = response.json["results"]
+
+    assert results["grated mozarella"]["product"]["id"] == "mozzarella"
+    assert results["grated mozarella"]["query"]["markup"] == (
+        "grated <mark>mozarella</mark>"
+    )
+    assert results["1 head of Brocolli"]["product"]["id"] == "broccoli"
+    assert results["2 jalepenos"]["product"]["id"] == "jalapeno"
+    assert results["gratd"]["product"] is None
+    assert response.headers["X-Spelling-Corrections"] == "3"
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_ordinary_words_not_corrected(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [
+        Product(id="onion", name="onion", frequency=10),
+        Product(id="rice", name="rice", frequency=10),
+        Product(id="milk", name="milk", frequency=10),
+        Product(id="spice", name="spice", frequency=10),
+    ]
+
+    descriptions = [
+        "2 cups diced",
+        "nice and warm",
+        "lice",
+        "a dash of vice",
+        "silk",
+        "thinly sliced",
+    ]
+    response = client.post("/ingredients/query", data={"descriptions[]": descriptions})
+    results = response.json["results"]
+
+    assert [results[description]["product"] for description in descriptions] == [
+        None
+    ] * len(descriptions)
+    assert response.headers["X-Spelling-Corrections"] == "0"
+
+
+@patch("web.ingredients.seed_stems")
+@patch("web.loader.urlopen")
+def test_hierarchy_not_modified(urlopen, seed_stems):
+    graph = ProductGraph([Product(id="tofu", name="tofu")])
+    graph.hierarchy_validators = {"etag": '"v1"', "last_modified": None}
+    urlopen.side_effect = HTTPError("url", 304, "Not Modified", {}, None)
+
+    assert load_product_graph(graph) is graph
+    assert not seed_stems.called
+    assert urlopen.call_args[0][0].get_header("If-none-match") == '"v1"'
+    assert graph.hierarchy_validators == {"etag": '"v1"', "last_modified": None}
@@ -0,0 +1,22 @@
+from io import BytesIO
+from unittest.mock import patch
+
+from web.loader import retrieve_hierarchy
+
+
+@patch("web.loader.urlopen")
+def test_hierarchy_streaming(urlopen):
+    response = BytesIO(
+        b'{"id": "onion", "product": "onion", "recipe_count": 10}\n'
+        b"\n"
+        b'{"id": "tofu", "product": "tofu", "recipe_count": 20}\n'
+    )
+    response.headers = {"ETag": '"v1"'}
+    urlopen.return_value = response
+
+    validators = {}
+    products = list(retrieve_hierarchy(validators))
+
+    assert [product.id for product in products] == ["onion", "tofu"]
+    assert [product.frequency for product in products] == [10, 20]
+    assert validators["etag"] == '"v1"'
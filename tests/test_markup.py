@@ -0,0 +1,19 @@
+from web.markup import highlight, leftmost_spans
+
+
+def test_highlight_spans():
+    text = "fry <tofu> in a frying pan & wok"
+    spans = [
+        (5, 9, None),
+        (16, 22, {"class": "equipment appliance"}),
+        (16, 26, {"class": "equipment vessel"}),
+        (29, 32, {"class": "equipment vessel"}),
+    ]
+
+    markup = highlight(text, leftmost_spans(spans))
+
+    assert markup == (
+        "fry &lt;<mark>tofu</mark>&gt; in a "
+        '<mark class="equipment appliance">frying</mark> pan &amp; '
+        '<mark class="equipment vessel">wok</mark>'
+    )
@@ -0,0 +1,34 @@
+from web.matching import Token, TokenTrie, analyze
+
+
+def test_trie_scan():
+    trie = TokenTrie()
+    trie.add(("slow", "cooker"), "slow cooker")
+    trie.add(("cooker",), "cooker")
+    trie.add(("oven",), "oven")
+
+    matches = list(trie.scan(["the", "slow", "cooker", "or", "oven"]))
+
+    assert matches == [
+        (1, 3, "slow cooker"),
+        (2, 3, "cooker"),
+        (4, 5, "oven"),
+    ]
+
+
+def test_token_offsets():
+    description = "250ml of Baker's yeast (or 1 tbsp [dried]), sifted"
+
+    tokens = list(analyze(description))
+
+    assert tokens == [
+        Token("250ml", 0, 5, False),
+        Token("of", 6, 8, False),
+        Token("baker", 9, 14, False),
+        Token("yeast", 17, 22, False),
+        Token("or", 24, 26, True),
+        Token("1", 27, 28, True),
+        Token("tbsp", 29, 33, True),
+        Token("dried", 35, 40, True),
+        Token("sifted", 44, 50, False),
+    ]
@@ -0,0 +1,31 @@
+from unittest.mock import patch
+
+from web.metrics import Histogram
+from web.models.product import Product
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    buckets, total, count = histogram.snapshot()
+
+    assert buckets == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert total == 2.65
+    assert count == 4
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_stage_metrics(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="tofu", name="tofu")]
+
+    client.post("/ingredients/query", data={"descriptions[]": ["firm tofu"]})
+    response = client.get("/metrics")
+    metrics = dict(line.rsplit(" ", 1) for line in response.text.splitlines())
+
+    assert 'stage_duration_seconds_count{stage="graph_build"}' in metrics
+    assert 'stage_duration_seconds_count{stage="ingredient_highlight"}' in metrics
+    assert metrics["graph_products"] == "1"
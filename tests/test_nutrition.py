@@ -0,0 +1,85 @@
+import json
+from unittest.mock import patch
+
+from web.models.nutrition import NutritionTable
+from web.models.product import Product
+
+
+def generate_product(id, **nutrition):
+    return Product(id=id, name=id, nutrition=nutrition or None)
+
+
+def test_nutrition_normalization():
+    table = NutritionTable(
+        [
+            generate_product("tofu", protein=8.0, protein_units="g", energy=76.0),
+            generate_product(
+                "salt", fat=500.0, fat_units="mg", energy=4.184, energy_units="kJ"
+            ),
+            generate_product("water"),
+            generate_product("oat", energy=389.0, energy_units="Cal"),
+            generate_product("leaf", energy=2000.0, energy_units="cal"),
+        ]
+    )
+
+    result = table.aggregate([("tofu", 200), ("salt", 10), ("water", 100)])
+
+    assert result["totals"]["protein"] == 16.0
+    assert result["totals"]["fat"] == 0.05
+    assert round(result["totals"]["energy"], 6) == 152.1
+    assert result["incomplete"] == ["salt", "tofu", "water"]
+
+    # Food-label calories are kilocalories, and small calories are not
+    result = table.aggregate([("oat", 100), ("leaf", 100)])
+    assert round(result["totals"]["energy"], 6) == 391.0
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_nutrition_aggregation(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [
+        generate_product("tofu", protein=8.0, energy=76.0, energy_units="kcal"),
+        generate_product("rice", protein=2.7, energy=548.0, energy_units="kJ"),
+    ]
+
+    response = client.post(
+        "/nutrition/aggregate",
+        json=[
+            {"ingredients": [["tofu", 100], {"product_id": "rice", "quantity": 50}]},
+            {"ingredients": [["unknown", 100]]},
+        ],
+    )
+    first, second = response.json
+
+    assert round(first["totals"]["protein"], 2) == 9.35
+    assert round(first["totals"]["energy"], 2) == 141.49
+    assert first["totals"]["energy_units"] == "kcal"
+    assert second["unknown"] == ["unknown"]
+
+    invalid = client.post("/nutrition/aggregate", json={"ingredients": [["tofu"]]})
+    assert invalid.status_code == 400
+    invalid = client.post("/nutrition/aggregate", json={"ingredients": [[[1], 5]]})
+    assert invalid.status_code == 400
+
+    # Invalid recipes within a stream are reported in place of their results
+    response = client.post(
+        "/nutrition/aggregate",
+        data=(
+            '{"ingredients": [["tofu", 100]]}\n'
+            '{"ingredients": [[["tofu"], 100]]}\n'
+            "{\n"
+            '{"ingredients": [["rice", 100]]}\n'
+        ),
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert [result.keys() >= {"totals"} for result in results] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert "Invalid product id" in results[1]["error"]
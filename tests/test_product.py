@@ -1,10 +1,5 @@
 from web.models.product import Product
-
-
-class MockGraph:
-    def __init__(self, products):
-        self.products = products
-        self.products_by_id = {product.id: product for product in products}
+from web.models.product_graph import ProductGraph
 
 
 def generate_product(name, id=None, frequency=1):
@@ -44,13 +39,18 @@ def test_metadata():
     a2 = generate_product(id="black_olive", name="black olives")
     a3 = generate_product(id="green_olive", name="green olives")
 
-    graph = MockGraph([a1, a2, a3])
+    graph = ProductGraph([a1, a2, a3])
     metadata = a3.get_metadata("green olive", graph)
 
     assert metadata["singular"] == "green olive"
     assert metadata["plural"] == "green olives"
     assert metadata["is_plural"] is False
 
+    metadata = a3.get_metadata("3 green olives, pitted", graph)
+    assert metadata["is_plural"] is True
+    assert metadata["product"] == "green olives"
+    assert "is_plural" not in graph.metadata_by_id[a3.id]
+
 
 def test_nutrition_construction():
     Product(
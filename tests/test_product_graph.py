@@ -0,0 +1,84 @@
+from web.models.product import Product
+from web.models.product_graph import ProductGraph
+
+
+def test_update_products():
+    graph = ProductGraph(
+        [
+            Product(id="onion", name="onion", frequency=10),
+            Product(id="tofu", name="tofu", frequency=20),
+            Product(id="bean", name="bean", frequency=20),
+        ]
+    )
+
+    updated = graph.updated(
+        [
+            Product(id="onion", name="onion", frequency=10),
+            Product(id="tofu", name="tofu", frequency=30),
+            Product(id="firm_tofu", name="firm tofu"),
+        ]
+    )
+
+    assert updated.products_by_id.keys() == {"onion", "tofu", "firm_tofu"}
+    assert updated.products_by_id["tofu"].frequency == 30
+    assert updated.product_index.query("bean") == []
+    assert updated.product_index.query("tofu")[0]["count"] == 30
+    assert updated.product_index.query("firm tofu")[0]["doc_id"] == "firm_tofu"
+
+    # The original graph is unchanged, since requests may still be reading it
+    assert graph.products_by_id.keys() == {"onion", "tofu", "bean"}
+    assert graph.products_by_id["tofu"].frequency == 20
+    assert graph.product_index.query("bean")[0]["doc_id"] == "bean"
+    assert graph.product_index.query("tofu")[0]["count"] == 20
+
+
+def test_update_during_request():
+    graph = ProductGraph([Product(id="tofu", name="tofu", frequency=20)])
+    matches = list(graph.product_matcher.scan(["block", "tofu"]))
+
+    graph.updated([Product(id="onion", name="onion", frequency=10)])
+
+    # Products matched before an update remain available from the graph
+    product = graph.products_by_id[matches[0][2][1]]
+    assert product.get_metadata("block tofu", graph)["product"] == "tofu"
+    assert list(graph.product_matcher.scan(["block", "tofu"])) == matches
+
+
+def test_product_matcher():
+    graph = ProductGraph(
+        [
+            Product(id="tofu", name="tofu", frequency=20),
+            Product(id="firm_tofu", name="firm tofu"),
+            Product(id="bean", name="bean", frequency=20),
+        ]
+    )
+    graph = graph.updated(
+        [
+            Product(id="tofu", name="tofu", frequency=20),
+            Product(id="firm_tofu", name="firm tofu"),
+        ]
+    )
+
+    matches = graph.product_matcher.scan(["block", "of", "firm", "tofu", "bean"])
+    assert [entry[1] for _, _, entry in matches] == ["firm_tofu", "tofu"]
+
+
+def test_duplicate_products():
+    def hierarchy():
+        return [
+            Product(id="smoke", name="hickory liquid smoke"),
+            Product(id="smoke", name="liquid smoke", frequency=10),
+            Product(id="olive", name="black olives", frequency=5),
+            Product(id="bean", name="baked beans", frequency=20),
+        ]
+
+    # Building a graph analyzes each product once; the result is the same as
+    # when the products are added to a graph by an update
+    built = ProductGraph(hierarchy(), ["hickory"])
+    updated = ProductGraph([], ["hickory"]).updated(hierarchy())
+
+    assert built.product_index.index == updated.product_index.index
+    assert built.metadata_by_id == updated.metadata_by_id
+    assert built.product_matcher.root == updated.product_matcher.root
+    assert built.products_by_id["smoke"].name == "liquid smoke"
+    assert built.products_by_id["smoke"].frequency == 11
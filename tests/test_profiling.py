@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from web.app import app
+from web.models.product import Product
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_request_profile(stopwords, hierarchy, client, tmp_path):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="tofu", name="tofu")]
+
+    with patch.dict(
+        app.config, PROFILING_ENABLED=True, PROFILE_DIRECTORY=str(tmp_path)
+    ):
+        response = client.post(
+            "/ingredients/query",
+            data={"descriptions[]": ["firm tofu"]},
+            headers={"X-Profile": "1"},
+        )
+        response.close()
+        profile_id = response.headers["X-Profile-Id"]
+        profile = client.get(f"/profiles/{profile_id}?sort=tottime")
+
+    assert profile.status_code == 200
+    assert "query_ingredient_batch" in profile.text
+
+
+def test_profiling_disabled(client):
+    response = client.get("/caches?profile")
+
+    assert "X-Profile-Id" not in response.headers
+    assert client.get(f"/profiles/{'0' * 32}").status_code == 404
+
+
+def test_profile_retention(client, tmp_path):
+    with patch.dict(
+        app.config,
+        PROFILING_ENABLED=True,
+        PROFILE_DIRECTORY=str(tmp_path),
+        PROFILE_LIMIT=2,
+    ):
+        profile_ids = []
+        for _ in range(3):
+            response = client.get("/live?profile")
+            response.close()
+            profile_ids.append(response.headers["X-Profile-Id"])
+
+        assert client.get(f"/profiles/{profile_ids[0]}").status_code == 404
+        assert client.get(f"/profiles/{profile_ids[2]}").status_code == 200
+
+        # Requests that arrive while another is being profiled are served
+        # without a profile
+        with patch("web.profiling.Profile.enable", side_effect=ValueError):
+            response = client.get("/live?profile")
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,60 @@
+import json
+from unittest.mock import patch
+
+from web.models.product import Product
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_recipe_query(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [
+        Product(id="bean", name="bean", frequency=20),
+        Product(id="baked_bean", name="baked bean"),
+    ]
+
+    response = client.post(
+        "/recipes/query",
+        json={
+            "ingredients": ["can of Baked Beans"],
+            "directions": ["empty beans into the karahi"],
+        },
+    )
+    ingredients = response.json["ingredients"]
+    directions = response.json["directions"]
+
+    assert ingredients["can of Baked Beans"]["product"]["id"] == "baked_bean"
+    assert directions[0]["markup"] == (
+        '<mark class="verb action">empty</mark> beans into the '
+        '<mark class="equipment vessel">karahi</mark>'
+    )
+
+
+def test_invalid_recipes(client):
+    for body in [[1, 2], {"ingredients": [1]}, {"ingredients": "onion"}]:
+        response = client.post("/recipes/query", json=body)
+
+        assert response.status_code == 400
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_recipe_stream_errors(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="bean", name="bean", frequency=20)]
+
+    response = client.post(
+        "/recipes/query",
+        data=(
+            '{"ingredients": ["beans"]}\n'
+            "{\n"
+            '{"directions": "empty beans"}\n'
+            '{"ingredients": ["beans"]}\n'
+        ),
+        content_type="application/x-ndjson",
+    )
+    results = [json.loads(line) for line in response.data.splitlines()]
+
+    assert response.status_code == 200
+    assert ["error" in result for result in results] == [False, True, True, False]
+    assert results[3]["ingredients"]["beans"]["product"]["id"] == "bean"
@@ -0,0 +1,94 @@
+from datetime import UTC, datetime, timedelta
+from threading import Event
+
+import pytest
+
+from web.refresh import GraphRefresher, GraphState, GraphUnavailable
+
+
+def test_initial_refresh_is_synchronous():
+    refresher = GraphRefresher(lambda previous: "graph")
+
+    assert refresher.current().graph == "graph"
+
+
+def test_expired_graph_served_during_refresh():
+    started, release = Event(), Event()
+    builds = []
+
+    def build(previous):
+        builds.append(previous)
+        started.set()
+        release.wait(timeout=5)
+        return "updated"
+
+    refresher = GraphRefresher(build)
+    stale = datetime.now(tz=UTC) - timedelta(hours=2)
+    refresher.state = GraphState(graph="original", loaded_at=stale, version=1)
+
+    assert refresher.current().graph == "original"
+    assert started.wait(timeout=5)
+
+    # Further requests during the rebuild do not trigger additional builds
+    assert refresher.current().graph == "original"
+    assert refresher.current().graph == "original"
+
+    release.set()
+    with refresher.lock:
+        pass
+
+    assert refresher.current().graph == "updated"
+    assert refresher.current().version > 1
+    assert builds == ["original"]
+
+
+def test_unchanged_graph_keeps_version():
+    refresher = GraphRefresher(lambda previous: previous)
+    stale = datetime.now(tz=UTC) - timedelta(hours=2)
+    refresher.state = GraphState(graph="original", loaded_at=stale, version=1)
+
+    state = refresher.refresh()
+
+    assert state.graph == "original"
+    assert state.version == 1
+    assert state.loaded_at > stale
+
+
+def test_failed_refresh_backoff():
+    builds = []
+
+    def build(previous):
+        builds.append(previous)
+        raise RuntimeError("backend unavailable")
+
+    refresher = GraphRefresher(build, retry_delay=timedelta(minutes=1))
+    stale = datetime.now(tz=UTC) - timedelta(hours=2)
+    refresher.state = GraphState(graph="original", loaded_at=stale, version=1)
+    refresher._background_refresh()
+
+    # Requests during the backoff period do not trigger further builds
+    assert refresher.current().graph == "original"
+    assert builds == ["original"]
+    failures = refresher.failures
+    assert refresher.retry_at() == failures.failed_at + timedelta(minutes=1)
+
+    # Each consecutive failure doubles the backoff period
+    refresher.failures = failures._replace(
+        failed_at=failures.failed_at - timedelta(minutes=1)
+    )
+    refresher._background_refresh()
+    assert builds == ["original", "original"]
+    failures = refresher.failures
+    assert refresher.retry_at() == failures.failed_at + timedelta(minutes=2)
+
+
+def test_initial_refresh_backoff():
+    def build(previous):
+        raise RuntimeError("backend unavailable")
+
+    refresher = GraphRefresher(build)
+
+    with pytest.raises(RuntimeError):
+        refresher.current()
+    with pytest.raises(GraphUnavailable):
+        refresher.current()
@@ -0,0 +1,104 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+from web.app import app
+from web.ingredients import load_product_graph
+from web.models.product import Product
+from web.models.product_graph import ProductGraph
+from web.snapshot import (
+    graph_digest,
+    load_cached_snapshot,
+    load_snapshot,
+    save_cached_snapshot,
+    save_snapshot,
+)
+
+
+def test_snapshot_roundtrip(tmp_path):
+    graph = ProductGraph(
+        [
+            Product(id="tofu", name="tofu", frequency=20),
+            Product(id="firm_tofu", name="firm tofu"),
+        ]
+    )
+
+    filename = tmp_path / "graph.snapshot"
+    save_snapshot(graph, filename)
+    loaded = load_snapshot(filename)
+
+    assert loaded.products_by_id.keys() == graph.products_by_id.keys()
+    hits = loaded.product_index.query("firm tofu")
+    assert hits[0]["doc_id"] == "firm_tofu"
+
+
+def test_snapshot_cache(tmp_path):
+    products = [Product(id="tofu", name="tofu", frequency=20)]
+    digest = graph_digest(products, [])
+
+    assert load_cached_snapshot(tmp_path, digest) is None
+
+    save_cached_snapshot(ProductGraph(products), tmp_path, digest)
+    assert load_cached_snapshot(tmp_path, digest).products_by_id.keys() == {"tofu"}
+
+    # Caching a different hierarchy replaces the previous snapshot
+    products.append(Product(id="onion", name="onion", frequency=10))
+    updated = graph_digest(products, [])
+    save_cached_snapshot(ProductGraph(products), tmp_path, updated)
+
+    assert updated != digest
+    assert load_cached_snapshot(tmp_path, digest) is None
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_snapshot_command(tmp_path):
+    # Run the entry point in a new interpreter, so that the request handler
+    # modules are imported in the order that the command imports them; the
+    # loader is patched before any of them import it
+    filename = tmp_path / "graph.snapshot"
+    script = f"""
+import runpy, sys
+from unittest.mock import patch
+from web.models.product import Product
+
+hierarchy = [Product(id="tofu", name="tofu", frequency=20)]
+with patch("web.loader.retrieve_hierarchy", return_value=hierarchy), patch(
+    "web.loader.retrieve_stopwords", return_value=[]
+):
+    sys.argv = ["web.snapshot", {str(filename)!r}]
+    runpy.run_module("web.snapshot", run_name="__main__")
+"""
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True)
+
+    assert result.returncode == 0, result.stderr.decode()
+    assert load_snapshot(filename).products_by_id.keys() == {"tofu"}
+
+
+def test_snapshot_cache_write_failure(tmp_path):
+    graph = ProductGraph([Product(id="tofu", name="tofu", frequency=20)])
+    digest = graph_digest(graph.products_by_id.values(), [])
+
+    # Snapshots that exceed the size limit are not cached, and no partial
+    # files are left behind
+    save_cached_snapshot(graph, tmp_path, digest, max_bytes=64)
+    assert list(tmp_path.iterdir()) == []
+
+    # Nor is a failure to write to the cache directory an error
+    save_cached_snapshot(graph, tmp_path / "missing", digest)
+    assert load_cached_snapshot(tmp_path / "missing", digest) is None
+
+
+def test_snapshot_reload(tmp_path):
+    filename = tmp_path / "graph.snapshot"
+    save_snapshot(ProductGraph([Product(id="tofu", name="tofu")]), filename)
+
+    # Snapshots are only read again once they have been replaced
+    with patch.dict(app.config, {"PRODUCT_GRAPH_SNAPSHOT": str(filename)}):
+        graph = load_product_graph()
+        assert load_product_graph(graph) is graph
+
+        save_snapshot(ProductGraph([Product(id="onion", name="onion")]), filename)
+        updated = load_product_graph(graph)
+
+    assert updated is not graph
+    assert updated.products_by_id.keys() == {"onion"}
@@ -0,0 +1,32 @@
+from web.spelling import SpellingIndex, edit_distance
+
+
+def test_edit_distance():
+    assert edit_distance("broccoli", "brocolli", limit=2) == 2
+    assert edit_distance("onion", "onoin", limit=2) == 1
+    assert edit_distance("onion", "garlic", limit=2) == 3
+
+
+def test_spelling_lookup():
+    index = SpellingIndex(
+        {"mozzarella": 1, "pepper": 20, "pepperoni": 2, "paper": 5},
+        ignored=["peppered"],
+    )
+
+    assert index.lookup("mozarela") == "mozzarella"
+    assert index.lookup("peper") == "pepper"
+    assert index.lookup("pepper") is None
+    assert index.lookup("peppered") is None
+    assert index.lookup("pep") is None
+
+
+def test_dictionary_words():
+    index = SpellingIndex({"rice": 20, "milk": 10, "onion": 5, "spice": 5})
+    dictionary = frozenset(["slice", "sliced", "onion"])
+
+    # Ordinary words are never corrected, whether written as they are listed
+    # or inflected; short words are never corrected either
+    assert index.correct(["slice"], ["sliced"], dictionary) == ["slice"]
+    assert index.correct(["slice"], dictionary=dictionary) == ["slice"]
+    assert index.correct(["nice", "lice", "silk"]) == ["nice", "lice", "silk"]
+    assert index.correct(["onoin"], ["onoin"], dictionary) == ["onion"]
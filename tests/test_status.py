@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+from web.app import app, preload_graph
+from web.models.product import Product
+
+
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_readiness(stopwords, hierarchy, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="tofu", name="tofu")]
+
+    with patch.object(app.graph_refresher, "refresh_in_background") as refresh:
+        loading = client.get("/ready")
+    assert loading.status_code == 503
+    assert loading.json == {"status": "loading"}
+    assert refresh.called
+    assert client.get("/products/tofu").status_code == 503
+    assert client.get("/live").status_code == 200
+
+    state = app.graph_refresher.refresh()
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json["version"] == state.version
+    assert response.json["products"] == 1
+    assert client.get("/products/tofu").status_code == 200
+
+
+@patch("web.app.gc")
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_preload(stopwords, hierarchy, gc, client):
+    stopwords.return_value = []
+    hierarchy.return_value = [Product(id="tofu", name="tofu")]
+
+    # Objects that are preloaded before workers are forked are frozen
+    preload_graph()
+
+    assert client.get("/ready").status_code == 200
+    assert gc.freeze.called
+
+
+@patch("web.app.gc")
+@patch("web.ingredients.retrieve_hierarchy")
+@patch("web.ingredients.retrieve_stopwords")
+def test_preload_failure(stopwords, hierarchy, gc, client):
+    stopwords.return_value = []
+    hierarchy.side_effect = OSError("backend unavailable")
+
+    # A graph that cannot be preloaded is reported as unavailable, and
+    # requests that require a graph fail fast until a retry is due
+    preload_graph()
+    response = client.get("/ready")
+
+    assert response.status_code == 503
+    assert response.json["status"] == "unavailable"
+    assert response.json["failures"] == 1
+    assert client.get("/live").status_code == 200
+
+    response = client.post("/ingredients/query", json=["tofu"])
+    assert response.status_code == 503
+    assert hierarchy.call_count == 1
+    assert not gc.freeze.called
@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+from web.directions import equipment_stemmer
+from web.matching import analyze
+from web.verbs import VerbExtractor, VerbLexicon
+
+TaggedToken = namedtuple("TaggedToken", ["idx", "text", "pos_"])
+
+
+class TaggingModel:
+    def __init__(self):
+        self.batches = []
+
+    def pipe(self, descriptions):
+        self.batches.append(list(descriptions))
+        for description in descriptions:
+            verb, *_ = description.split()
+            yield [TaggedToken(0, verb, "VERB")]
+
+
+def test_lexicon_clauses():
+    lexicon = VerbLexicon(["heat", "stir", "serve"], equipment_stemmer)
+    description = "Heat the oil over a low heat, then stir; and serve it"
+
+    spans = list(lexicon.spans(description, list(analyze(description))))
+
+    assert spans == [(0, 4, "Heat"), (35, 39, "stir"), (45, 50, "serve")]
+
+
+def test_lexicon_participles():
+    lexicon = VerbLexicon(["bring", "fry", "measure"], equipment_stemmer)
+    description = "Frying pan on the stove; measuring cup of stock; bring to a boil"
+
+    spans = list(lexicon.spans(description, list(analyze(description))))
+
+    assert spans == [(49, 54, "bring")]
+
+
+def test_model_batching():
+    extractor = VerbExtractor(lexicon=None, model_name="tagger")
+    extractor.model, extractor.loaded = TaggingModel(), True
+    descriptions = ["whisk the eggs", "fold in the flour"]
+
+    verbs = extractor.extract(descriptions, analyses=None)
+
+    assert verbs == [[(0, 5, "whisk")], [(0, 4, "fold")]]
+    assert extractor.model.batches == [descriptions]
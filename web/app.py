@@ -1,8 +1,37 @@
+import gc
+from traceback import print_exc
+
 from flask import Flask
 
 app = Flask(__name__)
+app.config.from_prefixed_env()
 
 
 import web.directions  # noqa
 import web.ingredients  # noqa
+import web.nutrition  # noqa
 import web.products  # noqa
+import web.profiling  # noqa
+import web.recipes  # noqa
+import web.status  # noqa
+
+
+def preload_graph():
+    # A graph that cannot be preloaded is loaded once workers are running, so
+    # that the failure can be reported by the readiness endpoint
+    try:
+        app.graph_refresher.refresh()
+    except Exception:
+        print("Could not preload the product graph; continuing without a graph")
+        print_exc()
+        return
+
+    # Exclude the preloaded objects from garbage collection, which would write
+    # to each of them, and so copy their pages, in every forked worker
+    gc.freeze()
+
+
+# Load the product graph before accepting requests when configured to do so;
+# with gunicorn's --preload option, workers then share the arbiter's graph
+if app.config.get("PRELOAD_GRAPH"):
+    preload_graph()
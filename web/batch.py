@@ -0,0 +1,96 @@
+from collections import deque
+from itertools import islice
+import json
+
+from flask import Response, abort, request, stream_with_context
+
+NDJSON = "application/x-ndjson"
+
+
+def encode(item):
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def batches(items, size):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def read_lines(stream):
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def valid_descriptions(descriptions):
+    return isinstance(descriptions, list) and all(
+        isinstance(description, str) for description in descriptions
+    )
+
+
+def read_ndjson_descriptions(stream):
+    # Yield the description on each line as it is read, or a ValueError in
+    # place of an invalid one, so that results can be produced incrementally
+    for line in read_lines(stream):
+        try:
+            item = json.loads(line)
+            description = item["description"] if isinstance(item, dict) else item
+        except (KeyError, ValueError) as e:
+            yield ValueError(f"Invalid description: {e}")
+            continue
+        if not isinstance(description, str):
+            yield ValueError(f"Invalid description: {description!r}")
+            continue
+        yield description
+
+
+def read_descriptions(field="descriptions"):
+    # Descriptions may be provided as newline-delimited JSON (a string, or an
+    # object containing a description, per line), as a JSON document, or as
+    # form-encoded fields; JSON documents are validated before any results are
+    # produced, and invalid lines are reported in place of their results
+    if request.mimetype == NDJSON:
+        return read_ndjson_descriptions(request.stream)
+    elif request.is_json:
+        body = request.get_json(silent=True)
+        descriptions = body.get(field, []) if isinstance(body, dict) else body
+    else:
+        descriptions = request.form.getlist(f"{field}[]")
+    if not valid_descriptions(descriptions):
+        return abort(400)
+    return descriptions
+
+
+def report_invalid(items, query, *args):
+    # Run a query over the valid descriptions among the items, and report each
+    # invalid one as an error in its position among the results; the query
+    # produces one result per description, after reading each description
+    errors, produced = deque(), 0
+
+    def descriptions():
+        valid = 0
+        for item in items:
+            if isinstance(item, ValueError):
+                errors.append((valid, item))
+                continue
+            valid += 1
+            yield item
+
+    for result in query(descriptions(), *args):
+        while errors and errors[0][0] <= produced:
+            yield {"error": str(errors.popleft()[1])}
+        produced += 1
+        yield result
+    for _, error in errors:
+        yield {"error": str(error)}
+
+
+def streaming_requested():
+    return request.mimetype == NDJSON or request.accept_mimetypes.best == NDJSON
+
+
+def stream_results(results):
+    # Emit each result as soon as it is available, one JSON object per line
+    lines = (encode(result) + b"\n" for result in results)
+    return Response(stream_with_context(lines), mimetype=NDJSON)
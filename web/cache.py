@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class StemCache:
+    def __init__(self, stem, maxsize=100000):
+        self.stem_uncached = stem
+        self.maxsize = maxsize
+        self.stems = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stem(self, token):
+        stem = self.stems.get(token)
+        if stem is not None:
+            self.hits += 1
+            return stem
+
+        # Once full, stop admitting entries rather than evicting them; the
+        # cache is seeded with the vocabularies that we expect to encounter
+        self.misses += 1
+        stem = self.stem_uncached(token)
+        if len(self.stems) < self.maxsize:
+            self.stems[token] = stem
+        return stem
+
+    def seed(self, tokens):
+        for token in tokens:
+            if token not in self.stems:
+                self.stem(token)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.stems),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
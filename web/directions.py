@@ -1,130 +1,174 @@
-from collections import defaultdict
-from functools import lru_cache
-from flask import jsonify, request
-from hashedixsearch import HashedIXSearch
-from snowballstemmer import stemmer
-# import spacy
-# from spacy.symbols import VERB
+from flask import jsonify
+from itertools import count
 from stop_words import get_stop_words as get_stopwords
 
 from web.app import app
+from web.batch import (
+    batches,
+    read_descriptions,
+    report_invalid,
+    stream_results,
+    streaming_requested,
+)
+from web.shared_caches import equipment_stems
 from web.loader import (
     CACHE_PATHS,
     load_queries,
 )
+from web.markup import highlight, leftmost_spans
+from web.matching import TokenTrie, analyze, stem, tokenize
+from web.metrics import timer
+from web.verbs import VerbExtractor, VerbLexicon, read_verbs
 
 
 class EquipmentStemmer:
-    stemmer_en = stemmer("english")
+    # Stems are shared by all instances, and are retained across requests
+    stems = equipment_stems
 
-    @lru_cache(maxsize=4096)
     def stem(self, x):
-        return self.stemmer_en.stemWord(x)
+        return self.stems.stem(x)
 
 
+EquipmentStemmer.stems.maxsize = app.config.get("STEM_CACHE_SIZE", 100000)
 stopwords = get_stopwords("en")
-# nlp = spacy.load("en_core_web_sm")
 appliance_queries = load_queries(CACHE_PATHS["appliance_queries"])
 utensil_queries = load_queries(CACHE_PATHS["utensil_queries"])
 vessel_queries = load_queries(CACHE_PATHS["vessel_queries"])
+equipment_stemmer = EquipmentStemmer()
+verb_extractor = VerbExtractor(
+    lexicon=VerbLexicon(read_verbs(CACHE_PATHS["verbs"]), equipment_stemmer),
+    model_name=app.config.get("VERB_MODEL", "en_core_web_sm"),
+)
+
+# Number of descriptions to process together when handling large requests
+BATCH_SIZE = 100
+
+
+def compile_matcher(query_matrix):
+    matcher = TokenTrie()
+    for rank, (entity_type, entity_category, queries) in enumerate(query_matrix):
+        for query in queries:
+            term = tuple(stem(tokenize(query), equipment_stemmer))
+            if not term or any(token in stopwords for token in term):
+                continue
+            matcher.add(term, (rank, query, term, entity_type, entity_category))
+    return matcher
+
+
+query_matrix = [
+    ("equipment", "appliance", appliance_queries),
+    ("equipment", "utensil", utensil_queries),
+    ("equipment", "vessel", vessel_queries),
+]
+matcher = compile_matcher(query_matrix)
+
+
+def vocabulary():
+    tokens = set(stopwords)
+    for entity_type, entity_category, queries in query_matrix:
+        for query in queries:
+            tokens.update(tokenize(query))
+    return tokens
+
+
+def match_entities(tokens):
+    # Scan the description tokens once, and report each distinct entity in
+    # order of query category and then of first appearance, along with the
+    # token positions of each of its occurrences
+    matches, occurrences = {}, []
+    stems = stem([token.text for token in tokens], equipment_stemmer)
+    for start, end, match in matcher.scan(stems):
+        matches.setdefault(match, start)
+        occurrences.append((start, end, match))
+
+    entities = []
+    for match, _ in sorted(matches.items(), key=lambda x: (x[0][0], x[1])):
+        rank, query, term, entity_type, entity_category = match
+        entities.append(
+            {
+                "name": query,
+                "term": term,
+                "type": entity_type,
+                "category": entity_category,
+            }
+        )
+    return entities, occurrences
+
+
+def entity_span(tokens, start, end, entity_type, entity_category):
+    attributes = {"class": f"{entity_type} {entity_category}"}
+    return tokens[start].start, tokens[end - 1].end, attributes
+
+
+def query_direction(doc_id, description, tokens, verb_spans):
+    # Collect the vocabulary entities found in the description
+    with timer("direction_entities"):
+        entities, occurrences = match_entities(tokens)
+    spans = [
+        entity_span(tokens, start, end, entity_type, entity_category)
+        for start, end, (*_, entity_type, entity_category) in occurrences
+    ]
+
+    # Collect unique verbs found in the description; a verb that overlaps
+    # equipment is part of the name of the equipment, and is not an action
+    verbs = set()
+    for start, end, verb in verb_spans:
+        if any(start < span[1] and span[0] < end for span in spans):
+            continue
+        spans.append((start, end, {"class": "verb action"}))
+        term = tuple(stem(tokenize(verb), equipment_stemmer))
+        if term in verbs:
+            continue
+        verbs.add(term)
+        entities.append(
+            {
+                "term": term,
+                "type": "verb",
+                "category": "action",
+            }
+        )
+
+    # Generate markup for the description from the entity occurrences found
+    # within it; the earliest and then shortest of overlapping occurrences
+    # is marked
+    markup = None
+    if entities:
+        with timer("direction_highlight"):
+            spans.sort(key=lambda span: span[:2])
+            markup = highlight(description, leftmost_spans(spans))
+
+    return {
+        "index": doc_id,
+        "description": description,
+        "markup": markup,
+        "entities": [
+            {
+                "name": entity["name"],
+                "type": entity["type"],
+                "category": entity["category"],
+            }
+            for entity in entities
+            if entity.get("name") is not None
+        ],
+    }
 
 
-def matches_by_document(index, queries, stemmer):
-    results_by_document = defaultdict(lambda: set())
-    query_hits = index.query_batch(queries, stopwords=stopwords)
-    for result, hits in query_hits:
-        for hit in hits:
-            results_by_document[hit["doc_id"]].add(result)
-    return results_by_document
+def query_directions(descriptions):
+    # Process descriptions in bounded batches; the verbs of each batch are
+    # extracted together, in a single pass
+    doc_ids = count()
+    for batch in batches(descriptions, BATCH_SIZE):
+        analyses = [list(analyze(description)) for description in batch]
+        with timer("direction_verbs"):
+            verbs = verb_extractor.extract(batch, analyses)
+        for description, tokens, verb_spans in zip(batch, analyses, verbs):
+            yield query_direction(next(doc_ids), description, tokens, verb_spans)
 
 
 @app.route("/directions/query", methods=["POST"])
 def equipment():
-    descriptions = request.form.getlist("descriptions[]")
-
-    stemmer = EquipmentStemmer()
-    index = HashedIXSearch(stemmer=stemmer)
-    for doc_id, doc in enumerate(descriptions):
-        index.add(doc_id, doc, ngrams=2, stopwords=stopwords)
-
-    query_matrix = {
-        "equipment": {
-            "appliance": appliance_queries,
-            "utensil": utensil_queries,
-            "vessel": vessel_queries,
-        },
-    }
-
-    # Run the query matrix against the document set and collect entities by doc
-    entities_by_doc = defaultdict(list)
-    for entity_type in query_matrix:
-        for entity_category in query_matrix[entity_type]:
-            queries = query_matrix[entity_type][entity_category]
-            queries_by_doc = matches_by_document(index, queries, stemmer)
-            for doc_id, queries in queries_by_doc.items():
-                for query in queries:
-                    term = next(index.tokenize(query))
-                    entities_by_doc[doc_id].append(
-                        {
-                            "name": query,
-                            "term": term,
-                            "type": entity_type,
-                            "category": entity_category,
-                        }
-                    )
-
-    # Collect unique verbs found in each input description
-    for doc_id, description in enumerate(descriptions):
-        tokens = []  # TODO: nlp(description)
-        verbs = {token.text for token in tokens if token.pos == VERB}
-        for verb in verbs:
-            term = next(index.tokenize(verb))
-            entities_by_doc[doc_id].append(
-                {
-                    "term": term,
-                    "type": "verb",
-                    "category": "action",
-                }
-            )
-
-    # Collect all entities for each document and then generate doc markup
-    markup_by_doc = {}
-    for doc_id, entities in entities_by_doc.items():
-        terms = []
-        term_attributes = {}
-        for entity in entities:
-            term, entity_type, entity_category = (
-                entity["term"],
-                entity["type"],
-                entity["category"],
-            )
-            terms.append(term)
-            term_attributes[term] = {
-                "class": f"{entity_type} {entity_category}",
-            }
-        markup_by_doc[doc_id] = index.highlight(
-            doc=descriptions[doc_id],
-            terms=terms,
-            case_sensitive=False,
-            term_attributes=term_attributes,
-        )
+    descriptions = read_descriptions()
 
-    results = []
-    for doc_id, description in enumerate(descriptions):
-        results.append(
-            {
-                "index": doc_id,
-                "description": description,
-                "markup": markup_by_doc.get(doc_id),
-                "entities": [
-                    {
-                        "name": entity["name"],
-                        "type": entity["type"],
-                        "category": entity["category"],
-                    }
-                    for entity in entities_by_doc.get(doc_id, [])
-                    if entity.get("name") is not None
-                ],
-            }
-        )
-    return jsonify(results)
+    if streaming_requested():
+        return stream_results(report_invalid(descriptions, query_directions))
+    return jsonify(list(query_directions(descriptions)))
@@ -1,102 +1,277 @@
 from collections import Counter, defaultdict
-from datetime import UTC, datetime, timedelta
-from flask import jsonify, request
-from hashedixsearch import HashedIXSearch
+from time import perf_counter
+from flask import jsonify
 
 from web.app import app
+from web.batch import (
+    batches,
+    read_descriptions,
+    report_invalid,
+    stream_results,
+    streaming_requested,
+)
+from web.shared_caches import equipment_stems, ingredient_results, product_stems
 from web.loader import (
     CACHE_PATHS,
+    HierarchyNotModified,
     retrieve_hierarchy,
     retrieve_stopwords,
 )
+from web.markup import find_term, highlight
+from web.matching import analyze, stem
+from web.metrics import observe, timer
 from web.models.product import Product
 from web.models.product_graph import ProductGraph
+from web.refresh import GraphRefresher
+from web.snapshot import (
+    graph_digest,
+    load_cached_snapshot,
+    load_snapshot,
+    save_cached_snapshot,
+    snapshot_validators,
+)
+from web.spelling import read_dictionary
 
+# The direction vocabulary is looked up when stems are seeded, so that the
+# request handler modules may be imported in any order
+import web.directions
 
-@app.before_request
-def preload_ingredient_data():
-    # HACK: Only perform ingredient preloading for the ingredient query URL path
-    if request.path != "/ingredients/query":
-        return
-
-    # Return cached product graph if it is available and has not yet expired
-    if hasattr(app, "graph"):
-        if datetime.now(tz=UTC) < app.graph_loaded_at + timedelta(hours=1):
-            return
 
-    # Otherwise, attempt to update the product graph
-    hierarchy = retrieve_hierarchy()
+def build_product_graph():
+    validators = {}
+    hierarchy = retrieve_hierarchy(validators)
 
     filename = CACHE_PATHS["stopwords"]
     stopwords = retrieve_stopwords(filename)
 
-    app.graph = ProductGraph(hierarchy, stopwords)
-    app.graph_loaded_at = datetime.now(tz=UTC)
+    cache_directory = app.config.get("PRODUCT_GRAPH_CACHE_DIRECTORY")
+    if not cache_directory:
+        graph = ProductGraph(hierarchy, stopwords)
+        graph.hierarchy_validators = validators
+        return graph
+
+    # The cache key covers the entire hierarchy, so it must be read in full
+    # before indexing; the products are retained by the graph in any case
+    hierarchy, stopwords = list(hierarchy), list(stopwords)
+    digest = graph_digest(hierarchy, stopwords)
+    graph = load_cached_snapshot(cache_directory, digest)
+    if not graph:
+        started = perf_counter()
+        graph = ProductGraph(hierarchy, stopwords)
+        print(f"Graph built in {perf_counter() - started:.2f}s")
+        max_bytes = app.config.get("PRODUCT_GRAPH_CACHE_MAX_BYTES")
+        save_cached_snapshot(graph, cache_directory, digest, max_bytes)
+
+    graph.hierarchy_validators = validators
+    return graph
+
+
+def update_product_graph(graph):
+    # Only apply the differences between the hierarchy and the current graph;
+    # the current graph is not changed, since requests may be reading it
+    validators = dict(graph.hierarchy_validators)
+    try:
+        updated = graph.updated(retrieve_hierarchy(validators))
+    except HierarchyNotModified:
+        return graph
+
+    updated.hierarchy_validators = validators
+    return updated
+
+
+def seed_stems(graph):
+    # Stem the product, equipment and stopword vocabularies ahead of requests
+    tokens = graph.vocabulary() | web.directions.vocabulary()
+    product_stems.seed(tokens)
+    equipment_stems.seed(tokens)
+
+
+def load_product_graph(previous=None):
+    # Prefer a prebuilt graph snapshot when one has been configured, and only
+    # reload it when the file has changed, so that workers continue to share
+    # a graph that was preloaded before they were started
+    snapshot = app.config.get("PRODUCT_GRAPH_SNAPSHOT")
+    if snapshot:
+        validators = snapshot_validators(snapshot)
+        if previous and previous.snapshot_validators == validators:
+            return previous
+        with timer("graph_snapshot_load"):
+            graph = load_snapshot(snapshot)
+        graph.snapshot_validators = validators
+    elif previous:
+        with timer("graph_refresh"):
+            graph = update_product_graph(previous)
+    else:
+        with timer("graph_build"):
+            graph = build_product_graph()
+
+    # An unchanged graph keeps the stems that were seeded when it was loaded
+    if graph is not previous:
+        seed_stems(graph)
+    return graph
+
+
+Product.stemmer.stems.maxsize = app.config.get("STEM_CACHE_SIZE", 100000)
+app.graph_refresher = GraphRefresher(load_product_graph)
+ingredient_results.maxsize = app.config.get("INGREDIENT_CACHE_SIZE", 10000)
+dictionary = read_dictionary(CACHE_PATHS["dictionary"])
+
+# Cached result for descriptions that do not match any product
+NO_MATCH = None, None, None
+
+# Number of descriptions to process together when handling large requests
+BATCH_SIZE = 100
+
 
+def find_product_candidates(tokens, graph, stats):
+    # Yield products whose names occur within the description tokens, skipping
+    # any that cannot outscore the best candidate found so far; products that
+    # share a name are sorted by descending frequency, so only the first of
+    # them that is found in the graph can be the best candidate
+    best_score = None
+    for start, end, entries in graph.product_matcher.matches(tokens):
+        examined = 0
+        for negative_frequency, product_id in entries:
+            score = end - start, -negative_frequency
+            if best_score and score <= best_score:
+                break
+            examined += 1
+            if product := graph.products_by_id.get(product_id):
+                best_score = score
+                yield product, start, end
+                break
+        stats["candidates_retrieved"] += examined
+        stats["candidates_pruned"] += len(entries) - examined
 
-def find_product_candidates(descriptions):
-    results = app.graph.product_index.query_batch(
-        descriptions, stopwords=app.graph.stopwords, query_limit=-1
-    )
-    for description, hits in results:
-        for hit in hits:
-            product = app.graph.products_by_id[hit["doc_id"]]
-            yield product
+
+def highlight_product(description, analysis, term):
+    # Mark the first occurrence of the product term, including any occurrence
+    # between brackets
+    stems = stem([token.text for token in analysis], Product.stemmer)
+    span = find_term(stems, term)
+    if span is None:
+        return highlight(description, [])
+    start, end = analysis[span[0]], analysis[span[1] - 1]
+    return highlight(description, [(start.start, end.end, None)])
+
+
+def normalize(description):
+    return " ".join(description.lower().split())
+
+
+def query_ingredients(descriptions, state, stats):
+    # Process descriptions in bounded batches, so that results are produced
+    # incrementally regardless of the number of descriptions
+    for batch in batches(descriptions, BATCH_SIZE):
+        yield from query_ingredient_batch(batch, state, stats)
+
+
+def query_ingredient_batch(descriptions, state, stats):
+    # Reuse results for descriptions that have been seen since the graph was
+    # loaded; results from previous graph versions are never retrieved again
+    results, pending = {}, defaultdict(list)
+    for doc_id, description in enumerate(descriptions):
+        key = state.version, normalize(description)
+        if key in pending:
+            pending[key].append(doc_id)
+        elif (result := ingredient_results.get(key)) is not None:
+            results[doc_id] = result
+        else:
+            pending[key].append(doc_id)
+    stats["cache_hits"] += len(results)
+    stats["cache_misses"] += len(pending)
+
+    # Tokenize each description once; tokens retain their positions within the
+    # description, and whether they are enclosed by brackets
+    analyses = {}
+    with timer("ingredient_analysis"):
+        for key, (doc_id, *_) in pending.items():
+            description = descriptions[doc_id]
+            analyses[description] = list(analyze(description))
+
+    # Select the best match for each description, disregarding content between
+    # brackets; longer product names are preferred, and then more-frequently
+    # used products
+    matches = {}
+    with timer("ingredient_candidates"):
+        for key, (doc_id, *_) in pending.items():
+            analysis = analyses[descriptions[doc_id]]
+            words = [token.text for token in analysis if not token.enclosed]
+            tokens = stem(words, Product.stemmer)
+            candidates = find_product_candidates(tokens, state.graph, stats)
+            for candidate, start, end in candidates:
+                matches[key] = candidate, tuple(tokens[start:end])
+            if key in matches:
+                continue
+
+            # Correct misspelt tokens only when no product was found; the
+            # original tokens are retained so that they can be highlighted
+            corrected = state.graph.spelling.correct(tokens, words, dictionary)
+            if corrected == tokens:
+                continue
+            stats["spelling_corrections"] += 1
+            candidates = find_product_candidates(corrected, state.graph, stats)
+            for candidate, start, end in candidates:
+                matches[key] = candidate, tuple(tokens[start:end])
+
+    # Build per-query result metadata, and cache the results
+    with timer("ingredient_metadata"):
+        for key, doc_ids in pending.items():
+            result = NO_MATCH
+            if key in matches:
+                product, term = matches[key]
+                description = descriptions[doc_ids[0]]
+                words = [token.text for token in analyses[description]]
+                metadata = product.get_metadata(description, state.graph, words)
+                result = product, term, metadata
+            ingredient_results.put(key, result)
+            for doc_id in doc_ids:
+                results[doc_id] = result
+
+    # Highlighting is timed per description, since results are yielded to the
+    # caller between descriptions
+    highlighting = 0.0
+    for doc_id, description in enumerate(descriptions):
+        product, term, metadata = results[doc_id]
+        markup = None
+        if product:
+            started = perf_counter()
+            analysis = analyses.get(description) or list(analyze(description))
+            markup = highlight_product(description, analysis, term)
+            highlighting += perf_counter() - started
+        yield description, {
+            "product": metadata,
+            "query": {
+                "markup": markup,
+            },
+        }
+    observe("ingredient_highlight", highlighting)
+
+
+def stream_ingredients(descriptions, state, stats):
+    for description, result in query_ingredients(descriptions, state, stats):
+        yield {"description": description, **result}
 
 
 @app.route("/ingredients/query", methods=["POST"])
 def ingredients():
-    descriptions = request.form.getlist("descriptions[]")
-
-    # Filter-out content between parentheses
-    unadorned_descriptions = []
-    for description in descriptions:
-        parens, unadorned_description = Counter(), ""
-        for char in description:
-            if char in {"(", "[", "{"}:
-                parens[char] += 1
-            if char in {")", "]", "}"}:
-                parens[char] -= 1
-            if not parens.total():
-                unadorned_description += char
-        unadorned_descriptions.append(unadorned_description)
-
-    # Build a local search index over the product descriptions
-    description_index = HashedIXSearch(stemmer=Product.stemmer)
-    for doc_id, description in enumerate(unadorned_descriptions):
-        description_index.add(doc_id, description)
-
-    # Track the best match for each product
-    results = defaultdict(lambda: None)
-    scores = defaultdict(lambda: 0.0)
-    for candidate in find_product_candidates(descriptions):
-        hits = description_index.query(candidate.name)
-        for hit in hits:
-            doc_id, score, terms = hit["doc_id"], hit["score"], hit["terms"]
-            if score > scores[doc_id]:
-                results[doc_id] = candidate, terms
-                scores[doc_id] = score
-
-    # Build per-query result metadata
-    markup = defaultdict(lambda: None)
-    metadata = defaultdict(lambda: None)
-    for doc_id, (product, terms) in results.items():
-        description = descriptions[doc_id]
-        markup[doc_id] = description_index.highlight(
-            doc=description, terms=terms, case_sensitive=False, limit=1
-        )
-        metadata[doc_id] = product.get_metadata(description, app.graph)
-
-    return jsonify(
-        {
-            "results": {
-                description: {
-                    "product": metadata[doc_id],
-                    "query": {
-                        "markup": markup[doc_id],
-                    },
-                }
-                for doc_id, description in enumerate(descriptions)
-            }
-        }
-    )
+    descriptions = read_descriptions()
+    state = app.graph_refresher.current()
+    stats = Counter()
+
+    if streaming_requested():
+        results = report_invalid(descriptions, stream_ingredients, state, stats)
+        return stream_results(results)
+
+    results = query_ingredients(descriptions, state, stats)
+    response = jsonify({"results": dict(results)})
+    for statistic in (
+        "cache_hits",
+        "cache_misses",
+        "candidates_retrieved",
+        "candidates_pruned",
+        "spelling_corrections",
+    ):
+        header = "X-" + statistic.replace("_", "-").title()
+        response.headers[header] = stats[statistic]
+    return response
@@ -1,18 +1,27 @@
 import json
 import os
-from urllib.request import urlopen
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 
 from web.models.product import Product
 
 
 CACHE_PATHS = {
     "stopwords": "web/data/generated/stopwords.txt",
+    "clearwords": "web/data/clear-words.txt",
+    "dictionary": "web/data/dictionary.txt",
     "appliance_queries": "web/data/equipment/appliances.txt",
     "utensil_queries": "web/data/equipment/utensils.txt",
     "vessel_queries": "web/data/equipment/vessels.txt",
+    "verbs": "web/data/verbs.txt",
 }
 
 
+class HierarchyNotModified(Exception):
+    pass
+
+
 def load_queries(filename):
     with open(filename) as f:
         return [line.strip().lower() for line in f.readlines()]
@@ -30,18 +39,50 @@ def retrieve_stopwords(filename):
             yield line.strip()
 
 
-def retrieve_hierarchy():
+def retrieve_hierarchy(validators=None):
     url = "http://backend-service/products/hierarchy"
     print(f"Reading hierarchy from {url}")
 
-    with urlopen(url) as f:
-        text = f.read().decode("utf-8")
-
-    for line in text.splitlines():
-        product = json.loads(line)
-        yield Product(
-            id=product["id"],
-            name=product["product"],
-            frequency=product["recipe_count"],
-            nutrition=product.get("nutrition"),
-        )
+    # Make the request conditional on the validators of a previous response;
+    # they are replaced with the validators of the response that is received
+    validators = validators if validators is not None else {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        response = urlopen(Request(url, headers=headers))
+    except HTTPError as e:
+        if e.code == 304:
+            print("Hierarchy has not been modified")
+            raise HierarchyNotModified()
+        raise
+
+    validators.clear()
+    validators["etag"] = response.headers.get("ETag")
+    validators["last_modified"] = response.headers.get("Last-Modified")
+
+    # Parse products from the response stream line-by-line as they arrive, so
+    # that they can be indexed without buffering the entire response body
+    started, received, count = perf_counter(), 0, 0
+    with response as f:
+        for line in f:
+            received += len(line)
+            if not line.strip():
+                continue
+            product = json.loads(line)
+            count += 1
+            yield Product(
+                id=product["id"],
+                name=product["product"],
+                frequency=product["recipe_count"],
+                nutrition=product.get("nutrition"),
+            )
+
+    duration = max(perf_counter() - started, 1e-6)
+    print(
+        f"Read {count} products ({received} bytes) in {duration:.2f}s: "
+        f"{count / duration:.0f} products/s, {received / duration:.0f} bytes/s"
+    )
@@ -0,0 +1,38 @@
+from xml.sax.saxutils import escape, quoteattr
+
+
+def render_match(text, attributes):
+    attributes = attributes or {}
+    attribs = "".join(f" {key}={quoteattr(value)}" for key, value in attributes.items())
+    return f"<mark{attribs}>{escape(text)}</mark>"
+
+
+def highlight(text, spans):
+    # Mark each (start, end, attributes) character span within the text; spans
+    # must be ordered and must not overlap
+    parts, position = [], 0
+    for start, end, attributes in spans:
+        parts.append(escape(text[position:start]))
+        parts.append(render_match(text[start:end], attributes))
+        position = end
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
+def leftmost_spans(spans):
+    # Select non-overlapping spans from spans ordered by start and then end, so
+    # that the earliest and then shortest of any overlapping spans is retained
+    position = 0
+    for span in spans:
+        if span[0] >= position:
+            position = span[1]
+            yield span
+
+
+def find_term(stems, term):
+    # Return the token positions of the first occurrence of a term
+    for start in range(len(stems) - len(term) + 1):
+        end = start + len(term)
+        if tuple(stems[start:end]) == term:
+            return start, end
+    return None
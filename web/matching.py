@@ -0,0 +1,120 @@
+import re
+from bisect import insort
+from collections import namedtuple
+from string import punctuation
+
+# Trie nodes map each token to a child node; this key holds the entry values
+# for the token sequence that ends at the node
+_VALUES = None
+
+# Bracket characters, and the change in nesting depth that each one causes
+_BRACKETS = {"(": 1, "[": 1, "{": 1, ")": -1, "]": -1, "}": -1}
+
+# Punctuation is removed from within words, except for the characters that the
+# search indexes permit within tokens; possessive suffixes are removed too
+_punctuation = "".join(c for c in punctuation if c not in "\\/-()[]{}")
+_re_removed = re.compile(r"'s|[%s]" % re.escape(_punctuation))
+_re_word = re.compile(r"(?:'s|[%s]|[\w\\/-])+" % re.escape(_punctuation))
+
+# A word from a text, with the offsets of the word within the text, and whether
+# the word is enclosed by brackets
+Token = namedtuple("Token", ["text", "start", "end", "enclosed"])
+
+
+def analyze(text):
+    # Split text into lowercase word tokens in a single pass, tracking bracket
+    # depth between words; the tokens match those of the search indexes, except
+    # that brackets always separate words
+    depth, position = 0, 0
+    for word in _re_word.finditer(text):
+        start, end = word.span()
+        for char in text[position:start]:
+            depth += _BRACKETS.get(char, 0)
+        position = end
+
+        # Remove characters from the word, and exclude any that were removed
+        # from its ends from the offsets of the token
+        removals = [removal.span() for removal in _re_removed.finditer(word.group())]
+        token = word.group()
+        if removals:
+            parts, offset = [], 0
+            for removal_start, removal_end in removals:
+                parts.append(token[offset:removal_start])
+                offset = removal_end
+            parts.append(token[offset:])
+            token = "".join(parts)
+            if not token:
+                continue
+            prefix = suffix = 0
+            for removal_start, removal_end in removals:
+                if removal_start != prefix:
+                    break
+                prefix = removal_end
+            for removal_start, removal_end in reversed(removals):
+                if removal_end != end - start - suffix:
+                    break
+                suffix = end - start - removal_start
+            start, end = start + prefix, end - suffix
+        yield Token(token.lower(), start, end, depth != 0)
+
+
+def tokenize(text):
+    # Split text into lowercase word tokens, with punctuation removed; this is
+    # the tokenization used by the search indexes, performed without stemming
+    return [token.text for token in analyze(text)]
+
+
+def stem(tokens, stemmer):
+    return [stemmer.stem(token) for token in tokens]
+
+
+def _copy_node(node):
+    return {
+        key: list(child) if key is _VALUES else _copy_node(child)
+        for key, child in node.items()
+    }
+
+
+class TokenTrie:
+    def __init__(self):
+        self.root = {}
+
+    def copy(self):
+        # Copy every node and entry list, so that the copy can be changed
+        # without affecting readers of this trie
+        trie = TokenTrie()
+        trie.root = _copy_node(self.root)
+        return trie
+
+    def add(self, tokens, value):
+        # Entry values are kept in sorted order at each node
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        insort(node.setdefault(_VALUES, []), value)
+
+    def remove(self, tokens, value):
+        node = self.root
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                return
+        if value in node.get(_VALUES, ()):
+            node[_VALUES].remove(value)
+
+    def matches(self, tokens):
+        # Yield the entry values for each token sequence that occurs within the
+        # tokens, along with the start and end positions of the sequence
+        for start in range(len(tokens)):
+            node = self.root
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if values := node.get(_VALUES):
+                    yield start, end + 1, values
+
+    def scan(self, tokens):
+        for start, end, values in self.matches(tokens):
+            for value in values:
+                yield start, end, value
@@ -0,0 +1,93 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    60.0,
+    300.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    def snapshot(self):
+        # Return cumulative bucket counts, in the form that Prometheus expects
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, buckets = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets, total, cumulative
+
+
+# Durations of each processing stage, keyed by stage name
+stage_durations = {}
+stage_durations_lock = Lock()
+
+
+def observe(stage, seconds):
+    histogram = stage_durations.get(stage)
+    if histogram is None:
+        with stage_durations_lock:
+            histogram = stage_durations.setdefault(stage, Histogram())
+    histogram.observe(seconds)
+
+
+@contextmanager
+def timer(stage):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, perf_counter() - started)
+
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render(gauges):
+    # Render stage histograms and point-in-time gauges in the Prometheus text
+    # exposition format
+    name = "stage_duration_seconds"
+    lines = [
+        f"# HELP {name} Duration of each processing stage",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, histogram in sorted(stage_durations.items()):
+        buckets, total, count = histogram.snapshot()
+        for bound, cumulative in buckets:
+            le = format_bound(bound)
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+    for gauge, (description, value) in gauges.items():
+        lines.append(f"# HELP {gauge} {description}")
+        lines.append(f"# TYPE {gauge} gauge")
+        lines.append(f"{gauge} {'NaN' if value is None else value}")
+    return "\n".join(lines) + "\n"
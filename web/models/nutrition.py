@@ -1,4 +1,55 @@
+from array import array
+from math import fsum, isnan, nan
+
+# Nutrients are stored in a canonical unit each, and values provided in other
+# units are converted to the canonical unit when a graph is loaded; units are
+# case-sensitive, since food labels use "Cal" for kilocalories, and "cal" is
+# the small calorie
+NUTRIENT_UNITS = {
+    "protein": "g",
+    "fat": "g",
+    "carbohydrates": "g",
+    "energy": "kcal",
+    "fibre": "g",
+}
+UNIT_CONVERSIONS = {
+    "g": {
+        "g": 1.0,
+        "mg": 0.001,
+        "µg": 0.000001,
+        "μg": 0.000001,
+        "ug": 0.000001,
+        "mcg": 0.000001,
+        "kg": 1000.0,
+    },
+    "kcal": {
+        "kcal": 1.0,
+        "Cal": 1.0,
+        "cal": 0.001,
+        "kJ": 1 / 4.184,
+        "kj": 1 / 4.184,
+        "J": 1 / 4184,
+    },
+}
+
+# Nutrition values describe this quantity of each product, in grams
+NUTRITION_BASIS = 100
+
+
 class Nutrition:
+    __slots__ = (
+        "protein",
+        "protein_units",
+        "fat",
+        "fat_units",
+        "carbohydrates",
+        "carbohydrates_units",
+        "energy",
+        "energy_units",
+        "fibre",
+        "fibre_units",
+    )
+
     def __init__(
         self,
         protein=None,
@@ -18,7 +69,9 @@ class Nutrition:
         self.fat_units = fat_units
         self.carbohydrates = carbohydrates
         self.carbohydrates_units = carbohydrates_units
+        self.energy = energy
         self.energy_units = energy_units
+        self.fibre = fibre
         self.fibre_units = fibre_units
 
     def to_dict(self):
@@ -27,7 +80,67 @@ class Nutrition:
             "protein_units": self.protein_units,
             "fat": self.fat,
             "fat_units": self.fat_units,
+            "carbohydrates": self.carbohydrates,
             "carbohydrates_units": self.carbohydrates_units,
+            "energy": self.energy,
             "energy_units": self.energy_units,
+            "fibre": self.fibre,
             "fibre_units": self.fibre_units,
         }
+
+    def normalized(self, nutrient):
+        # Return a nutrient value in its canonical unit; values without units
+        # are assumed to be in the canonical unit already
+        value = getattr(self, nutrient)
+        units = getattr(self, f"{nutrient}_units")
+        if value is None:
+            return nan
+        if units is None:
+            return float(value)
+        conversions = UNIT_CONVERSIONS[NUTRIENT_UNITS[nutrient]]
+        factor = conversions.get(units.strip())
+        return float(value) * factor if factor is not None else nan
+
+
+class NutritionTable:
+    def __init__(self, products):
+        # Each nutrient is held in a column of values indexed by product row;
+        # missing values are stored as NaN
+        self.rows, self.product_ids = {}, []
+        self.columns = {nutrient: array("d") for nutrient in NUTRIENT_UNITS}
+        for product in products:
+            self.rows[product.id] = len(self.product_ids)
+            self.product_ids.append(product.id)
+            for nutrient, column in self.columns.items():
+                nutrition = product.nutrition
+                column.append(nutrition.normalized(nutrient) if nutrition else nan)
+
+    def aggregate(self, ingredients):
+        # Sum the nutrition of (product id, quantity in grams) pairs; products
+        # that are not known, or that lack a nutrient, are reported separately
+        rows, weights, unknown = [], [], []
+        for product_id, quantity in ingredients:
+            row = self.rows.get(product_id)
+            if row is None:
+                unknown.append(product_id)
+                continue
+            rows.append(row)
+            weights.append(quantity / NUTRITION_BASIS)
+
+        totals, incomplete = {}, set()
+        for nutrient, column in self.columns.items():
+            values = list(map(column.__getitem__, rows))
+            missing = [row for row, value in zip(rows, values) if isnan(value)]
+            incomplete.update(missing)
+            totals[nutrient] = fsum(
+                value * weight
+                for value, weight in zip(values, weights)
+                if not isnan(value)
+            )
+            totals[f"{nutrient}_units"] = NUTRIENT_UNITS[nutrient]
+
+        return {
+            "totals": totals,
+            "unknown": unknown,
+            "incomplete": sorted(self.product_ids[row] for row in incomplete),
+        }
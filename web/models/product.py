@@ -1,35 +1,46 @@
-from functools import lru_cache
 import json
+from sys import intern
 
 from hashedixsearch import HashedIXSearch
 import inflect
 from snowballstemmer import stemmer
 from unidecode import unidecode
 
+from web.cache import StemCache
+from web.matching import tokenize
 from web.models.nutrition import Nutrition
 
+stemmer_en = stemmer("english")
+
+
+def stem_product_term(x):
+    x = unidecode(x)
+    # note: snowball stemmer doesn't provide (or aim to provide) idempotency
+    # when applied in multiple rounds to any given term.  while we could
+    # repeatedly apply stemming until a term converges, that seems
+    # computationally unpredictable and wasteful.  for now, apply stemming
+    # twice, to handle all the cases that we're aware of (so far) -- mayonnaise
+    #
+    # mayonnaise -> mayonnais -> mayonnai
+    return stemmer_en.stemWord(stemmer_en.stemWord(x))
+
 
 class Product:
+    __slots__ = ("name", "id", "frequency", "stopwords", "nutrition")
+
     class ProductStemmer:
-        stemmer_en = stemmer("english")
+        # Stems are shared by all instances, and are retained across requests
+        stems = StemCache(stem_product_term)
 
-        @lru_cache(maxsize=4096)
         def stem(self, x):
-            x = unidecode(x)
-            # note: snowball stemmer doesn't provide (or aim to provide) idempotency
-            # when applied in multiple rounds to any given term.  while we could
-            # repeatedly apply stemming until a term converges, that seems
-            # computationally unpredictable and wasteful.  for now, apply stemming
-            # twice, to handle all the cases that we're aware of (so far) -- mayonnaise
-            #
-            # mayonnaise -> mayonnais -> mayonnai
-            return self.stemmer_en.stemWord(self.stemmer_en.stemWord(x))
+            return self.stems.stem(x)
 
     stemmer = ProductStemmer()
     inflector = inflect.engine()
 
     def __init__(self, name, id=None, frequency=0, nutrition=None):
-        self.name = name
+        # Many products share names, so retain a single copy of each name
+        self.name = intern(name)
         self.id = id
         self.frequency = max(frequency, 1)
 
@@ -71,8 +82,7 @@ class Product:
         tokens = self.tokenize()
         return " ".join(tokens)
 
-    @lru_cache(maxsize=4096)
-    def _static_metadata(self, graph):
+    def static_metadata(self):
         singular = Product.inflector.singular_noun(self.name)
         singular = singular or self.name
         plural = Product.inflector.plural_noun(singular)
@@ -85,9 +95,12 @@ class Product:
             "nutrition": nutrition,
         }
 
-    def get_metadata(self, description, graph):
-        metadata = self._static_metadata(graph)
-        is_plural = metadata["plural"] in description.lower()
+    def get_metadata(self, description, graph, terms=None):
+        # Descriptions may be provided along with their existing tokenization
+        if terms is None:
+            terms = tokenize(description)
+        metadata = dict(graph.metadata_by_id[self.id])
+        is_plural = graph.is_plural(self, terms)
         metadata["is_plural"] = is_plural
         metadata["product"] = metadata["plural" if is_plural else "singular"]
         return metadata
@@ -1,77 +1,297 @@
+from collections import Counter, defaultdict, namedtuple
+from copy import copy
+from functools import lru_cache
+from itertools import chain, takewhile
+from time import perf_counter
+
 from hashedixsearch import HashedIXSearch
+from stop_words import get_stop_words as get_stopwords
 
+from web.loader import CACHE_PATHS
+from web.matching import TokenTrie, stem, tokenize
+from web.models.nutrition import NutritionTable
 from web.models.product import Product
+from web.spelling import SpellingIndex
+
+# The index terms, matcher term and static metadata derived from a product
+ProductAnalysis = namedtuple("ProductAnalysis", ["terms", "name_term", "metadata"])
+
+tokenizer = HashedIXSearch(stemmer=Product.stemmer)
+
+
+@lru_cache
+def read_clearwords(filename):
+    clearwords = []
+    with open(filename) as f:
+        for line in f.readlines():
+            if line.startswith("#"):
+                continue
+            line = line.strip().lower()
+            for term in tokenizer.tokenize(line):
+                if not term:
+                    continue
+                clearwords.append(term[0])
+    return tuple(clearwords)
+
+
+def analyze_terms(product):
+    # Products are indexed by the n-grams of their name, and matched by its
+    # leading n-gram, only when their name contains terms that are not
+    # stopwords
+    terms = list(takewhile(bool, tokenizer.tokenize(product.to_doc())))
+    name_term = next(tokenizer.tokenize(product.name)) if terms else None
+    return terms, name_term or None
+
+
+def analyze_product(product):
+    return ProductAnalysis(*analyze_terms(product), product.static_metadata())
 
 
 class ProductGraph:
     def __init__(self, products, stopwords=None):
-        stopwords = list(stopwords or [])
+        self.source_stopwords = list(stopwords or [])
+        self.hierarchy_validators = {}
+        self.snapshot_validators = None
         self.products_by_id = {}
         self.product_index = HashedIXSearch(stemmer=Product.stemmer)
-        self.build_product_index(products, stopwords)
-        self.stopwords = list(self.process_stopwords(stopwords))
-        self.stopword_index = self.build_stopword_index()
+        analyses = self.build_product_index(products, self.source_stopwords)
+        self.product_matcher = self.build_product_matcher(analyses)
+        self.build_metadata(analyses)
+        self.nutrition = NutritionTable(self.products_by_id.values())
+        self.stopwords = list(self.process_stopwords(self.source_stopwords))
+        self.stopword_terms = self.build_stopword_terms()
+        self.spelling = self.build_spelling_index()
 
     def build_product_index(self, products, stopwords):
-        clearwords = set(self.get_clearwords())
-        product_stopwords = []
-        for stopword in stopwords or []:
-            if stopword not in clearwords:
-                product_stopwords.append(stopword)
+        # Product stopwords are held in a set, since every token of every
+        # product name is checked for membership
+        clearwords = frozenset(self.get_clearwords())
+        self.product_stopwords = frozenset(
+            stopword for stopword in stopwords or [] if stopword not in clearwords
+        )
 
+        # Retain the analysis of each product for the remaining build stages;
+        # the analysis of a product merged from duplicates is discarded
+        analyses = {}
         count = 0
         for product in products:
+            product.stopwords = self.product_stopwords
+            analysis = analyze_product(product)
             count += 1
             if count % 1000 == 0:
                 print(f"- {count} documents indexed")
 
-            product.stopwords = product_stopwords
-            self.product_index.add(
-                doc_id=product.id,
-                doc=product.to_doc(),
-                count=product.frequency,
-            )
+            self.index_product(product, analysis.terms)
             if product.id not in self.products_by_id:
                 self.products_by_id[product.id] = product
+                analyses[product.id] = analysis
             else:
                 self.products_by_id[product.id] += product
+                analyses[product.id] = None
         print(f"- {count} documents indexed")
+        return analyses
+
+    def index_product(self, product, terms=None):
+        product.stopwords = self.product_stopwords
+        if terms is None:
+            terms = analyze_product(product).terms
+        for term in terms:
+            self.product_index.index.add_term_occurrence(
+                term, product.id, count=product.frequency
+            )
+
+    def matcher_entry(self, product):
+        # Matcher entries sort by descending product frequency
+        return -product.frequency, product.id
+
+    def build_product_matcher(self, analyses):
+        matcher = TokenTrie()
+        for product in self.products_by_id.values():
+            analysis = analyses.get(product.id) or analyze_product(product)
+            if analysis.name_term:
+                matcher.add(analysis.name_term, self.matcher_entry(product))
+        return matcher
+
+    def plural_term(self, text):
+        return tuple(tokenize(text))
+
+    def add_metadata(self, product, metadata=None):
+        # Replace any previous metadata for the product before unlisting its
+        # previous plural form, so that metadata is always available
+        previous = self.metadata_by_id.get(product.id)
+        metadata = metadata or product.static_metadata()
+        self.metadata_by_id[product.id] = metadata
+        if previous and previous["plural"] == metadata["plural"]:
+            return
+        if term := self.plural_term(metadata["plural"]):
+            self.plural_matcher.add(term, product.id)
+        if previous:
+            self.remove_plural(previous, product.id)
+
+    def remove_metadata(self, product):
+        self.remove_plural(self.metadata_by_id.pop(product.id), product.id)
+
+    def remove_plural(self, metadata, product_id):
+        if term := self.plural_term(metadata["plural"]):
+            self.plural_matcher.remove(term, product_id)
+
+    def build_metadata(self, analyses):
+        # Inflect product names once, so that requests only perform lookups
+        self.metadata_by_id = {}
+        self.plural_matcher = TokenTrie()
+        for product in self.products_by_id.values():
+            analysis = analyses.get(product.id)
+            self.add_metadata(product, analysis.metadata if analysis else None)
+
+    def is_plural(self, product, terms):
+        matches = self.plural_matcher.scan(terms)
+        return any(product_id == product.id for _, _, product_id in matches)
+
+    def remove_documents(self, doc_ids):
+        if not doc_ids:
+            return
+
+        # HashedIndex has no removal API, so remove postings from its storage
+        index = self.product_index.index
+        terms = index.items()
+        for term in list(terms):
+            postings = terms[term]
+            for doc_id in [doc_id for doc_id in postings if doc_id in doc_ids]:
+                del postings[doc_id]
+            if not postings:
+                del terms[term]
+        for doc_id in doc_ids:
+            index._documents.pop(doc_id, None)
+
+    def copy(self):
+        # Copy the structures that updates change, so that an update can be
+        # applied while requests continue to read this graph; products and
+        # their metadata are replaced rather than changed, so they are shared
+        graph = copy(self)
+        graph.hierarchy_validators = dict(self.hierarchy_validators)
+        graph.products_by_id = dict(self.products_by_id)
+        graph.metadata_by_id = dict(self.metadata_by_id)
+        graph.product_matcher = self.product_matcher.copy()
+        graph.plural_matcher = self.plural_matcher.copy()
+        graph.product_index = copy(self.product_index)
+        graph.product_index.index = index = copy(self.product_index.index)
+        index._terms = {
+            term: postings.copy() for term, postings in index.items().items()
+        }
+        index._documents = index._documents.copy()
+        return graph
+
+    def updated(self, products):
+        # Return a graph that contains the given products; this graph is left
+        # unchanged, and the differences are applied to a copy of it
+        entries_by_id = defaultdict(list)
+        for product in products:
+            entries_by_id[product.id].append(product)
+
+        # Determine the products that differ from those in the current graph
+        merged_by_id = {}
+        for product_id, entries in entries_by_id.items():
+            merged = copy(entries[0])
+            for entry in entries[1:]:
+                merged += entry
+            existing = self.products_by_id.get(product_id)
+            if existing is None or existing.to_dict() != merged.to_dict():
+                merged_by_id[product_id] = merged
+        removed = self.products_by_id.keys() - entries_by_id.keys()
+        added = merged_by_id.keys() - self.products_by_id.keys()
+        changed = merged_by_id.keys() - added
+        print(
+            f"- {len(added)} products added, {len(changed)} changed, "
+            f"{len(removed)} removed"
+        )
+        if not removed and not merged_by_id:
+            return copy(self)
+
+        graph = self.copy()
+        graph.apply_changes(entries_by_id, merged_by_id, removed)
+        return graph
+
+    def apply_changes(self, entries_by_id, merged_by_id, removed):
+        # Remove stale postings before their products, and add new products
+        # before their postings, so that index hits always resolve to products
+        for product_id in removed | merged_by_id.keys():
+            if product := self.products_by_id.get(product_id):
+                _, term = analyze_terms(product)
+                if term:
+                    self.product_matcher.remove(term, self.matcher_entry(product))
+        self.remove_documents(removed | merged_by_id.keys())
+        for product_id in removed:
+            product = self.products_by_id.pop(product_id)
+            self.remove_metadata(product)
+        for product_id, merged in merged_by_id.items():
+            merged.stopwords = self.product_stopwords
+            self.add_metadata(merged)
+            self.products_by_id[product_id] = merged
+            for entry in entries_by_id[product_id]:
+                self.index_product(entry)
+            _, term = analyze_terms(merged)
+            if term:
+                self.product_matcher.add(term, self.matcher_entry(merged))
+
+        self.nutrition = NutritionTable(self.products_by_id.values())
+        self.stopwords = list(self.process_stopwords(self.source_stopwords))
+        self.stopword_terms = self.build_stopword_terms()
+        self.spelling = self.build_spelling_index()
+
+    def vocabulary(self):
+        tokens = set()
+        for text in chain(
+            (product.name for product in self.products_by_id.values()),
+            self.source_stopwords,
+        ):
+            tokens.update(tokenize(text))
+        return tokens
 
     def get_clearwords(self):
-        with open("web/data/clear-words.txt") as f:
-            for line in f.readlines():
-                if line.startswith("#"):
-                    continue
-                line = line.strip().lower()
-                for term in self.product_index.tokenize(line):
-                    if not term:
-                        continue
-                    yield term[0]
+        return read_clearwords(CACHE_PATHS["clearwords"])
 
     def process_stopwords(self, stopwords):
-        clearwords = list(self.get_clearwords())
+        started = perf_counter()
+        clearwords = frozenset(self.get_clearwords())
+        exact_terms = {}
         for stopword in stopwords:
-            for term in self.product_index.tokenize(
-                doc=stopword,
-                stopwords=clearwords,
-            ):
+            for term in tokenizer.tokenize(doc=stopword, stopwords=clearwords):
                 if not term:
                     continue
-                if self.product_index.query_exact(term):
+                if term not in exact_terms:
+                    exact_terms[term] = self.product_index.query_exact(term)
+                if exact_terms[term]:
                     continue
                 yield stopword
+        print(f"- stopwords processed in {perf_counter() - started:.3f}s")
 
-    def build_stopword_index(self):
-        index = HashedIXSearch()
-        for doc_id, stopword in enumerate(self.stopwords):
-            index.add(doc_id, stopword)
-        return index
+    def build_stopword_terms(self):
+        # Map each single-term stopword from its term, retaining the first
+        # stopword where several share a term
+        stopword_terms = {}
+        for stopword in self.stopwords:
+            terms = list(takewhile(bool, HashedIXSearch().tokenize(stopword)))
+            if len(terms) == 1:
+                stopword_terms.setdefault(terms[0], stopword)
+        return stopword_terms
+
+    def build_spelling_index(self):
+        # Suggest the stems of product names as corrections, preferring those
+        # of frequently-used products; stopwords are recognised as words, but
+        # are never corrected or suggested
+        frequencies = Counter()
+        for product in self.products_by_id.values():
+            for token in stem(tokenize(product.name), Product.stemmer):
+                frequencies[token] += product.frequency
+        ignored = set()
+        for stopword in chain(self.source_stopwords, get_stopwords("en")):
+            ignored.update(stem(tokenize(stopword), Product.stemmer))
+        return SpellingIndex(frequencies, ignored)
 
     def filter_products(self):
         for product in self.products_by_id.values():
             for term in self.product_index.tokenize(product.name, ngrams=1):
-                doc_id = self.stopword_index.query_exact(term)
-                if doc_id is not None:
-                    product.stopwords.append(self.stopwords[doc_id])
+                if stopword := self.stopword_terms.get(term):
+                    product.stopwords = product.stopwords | {stopword}
             if self.product_index.tokenize(product.name, product.stopwords):
                 yield product
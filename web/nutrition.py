@@ -0,0 +1,59 @@
+import json
+
+from flask import abort, jsonify, request
+
+from web.app import app
+from web.batch import NDJSON, stream_results
+
+
+def ingredient_pair(ingredient):
+    # Ingredients are (product id, quantity) pairs, or objects with those fields
+    if isinstance(ingredient, dict):
+        ingredient = ingredient.get("product_id"), ingredient.get("quantity")
+    product_id, quantity = ingredient
+    if not isinstance(product_id, str):
+        raise ValueError(f"Invalid product id: {product_id!r}")
+    if not isinstance(quantity, (int, float)) or isinstance(quantity, bool):
+        raise ValueError(f"Invalid quantity for product: {product_id}")
+    return product_id, quantity
+
+
+def aggregate_recipe(recipe, table):
+    try:
+        ingredients = [ingredient_pair(item) for item in recipe["ingredients"]]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid recipe: {e}")
+    return table.aggregate(ingredients)
+
+
+def aggregate_ndjson(stream, table):
+    # Each line is aggregated independently, and an invalid recipe is reported
+    # in place of its result, since earlier results may already have been sent
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield aggregate_recipe(json.loads(line), table)
+        except ValueError as e:
+            yield {"error": str(e)}
+
+
+@app.route("/nutrition/aggregate", methods=["POST"])
+def aggregate_nutrition():
+    # Nutrition is aggregated for a single recipe provided as a JSON object, for
+    # each of a list of them, or for each of a stream of newline-delimited ones
+    state = app.graph_refresher.current()
+    table = state.graph.nutrition
+
+    if request.mimetype == NDJSON:
+        return stream_results(aggregate_ndjson(request.stream, table))
+
+    recipes = request.get_json(silent=True)
+    try:
+        if isinstance(recipes, dict):
+            return jsonify(aggregate_recipe(recipes, table))
+        if isinstance(recipes, list):
+            return jsonify([aggregate_recipe(recipe, table) for recipe in recipes])
+    except ValueError:
+        return abort(400)
+    return abort(400)
@@ -5,7 +5,12 @@ from web.app import app
 
 @app.route("/products/<product_id>")
 def product(product_id):
-    product = app.graph.products_by_id.get(product_id)
+    # Products are only served once a graph has been loaded
+    state = app.graph_refresher.state
+    if not state:
+        return abort(503)
+    graph = state.graph
+    product = graph.products_by_id.get(product_id)
     if not product:
         return abort(404)
-    return jsonify(product.get_metadata(product.name, app.graph))
+    return jsonify(product.get_metadata(product.name, graph))
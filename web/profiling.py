@@ -0,0 +1,97 @@
+import os
+from cProfile import Profile
+from glob import glob
+from io import StringIO
+from pstats import Stats
+from tempfile import gettempdir
+from uuid import UUID, uuid4
+
+from flask import Response, abort, g, request
+
+from web.app import app
+
+PROFILE_SORT_KEYS = {"cumulative", "tottime", "calls"}
+
+
+def profile_directory():
+    return app.config.get("PROFILE_DIRECTORY") or gettempdir()
+
+
+def profile_filename(profile_id):
+    return os.path.join(profile_directory(), f"profile-{profile_id}.prof")
+
+
+def prune_profiles():
+    # Retain only the most recent profiles, to bound their storage use
+    limit = app.config.get("PROFILE_LIMIT", 100)
+    filenames = glob(profile_filename("*"))
+    if len(filenames) <= limit:
+        return
+    filenames.sort(key=os.path.getmtime)
+    for filename in filenames[: len(filenames) - limit]:
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+
+def profiling_requested():
+    if not app.config.get("PROFILING_ENABLED"):
+        return False
+    return "X-Profile" in request.headers or "profile" in request.args
+
+
+@app.before_request
+def start_profile():
+    if not profiling_requested():
+        return
+    # Only a single profiler may be active at a time from Python 3.12, so a
+    # request that arrives while another is being profiled is not profiled
+    profile = Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return
+    g.profile_id, g.profile = uuid4().hex, profile
+
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+
+    # Streamed responses are produced after this hook returns, so profiling
+    # continues until the response has been sent in full
+    filename = profile_filename(g.profile_id)
+
+    def save_profile():
+        profile.disable()
+        profile.dump_stats(filename)
+        prune_profiles()
+
+    response.call_on_close(save_profile)
+    response.headers["X-Profile-Id"] = g.profile_id
+    return response
+
+
+@app.route("/profiles/<profile_id>")
+def profile(profile_id):
+    if not app.config.get("PROFILING_ENABLED"):
+        return abort(404)
+    try:
+        profile_id = UUID(hex=profile_id).hex
+    except ValueError:
+        return abort(404)
+    filename = profile_filename(profile_id)
+    if not os.path.exists(filename):
+        return abort(404)
+
+    # Summarize the functions that the request spent the most time within
+    sort = request.args.get("sort", "cumulative")
+    if sort not in PROFILE_SORT_KEYS:
+        return abort(400)
+    limit = request.args.get("limit", 50, type=int)
+    output = StringIO()
+    Stats(filename, stream=output).sort_stats(sort).print_stats(limit)
+    return Response(output.getvalue(), mimetype="text/plain")
@@ -0,0 +1,78 @@
+from collections import Counter
+import json
+
+from flask import abort, jsonify, request
+
+from web.app import app
+from web.batch import (
+    NDJSON,
+    stream_results,
+    valid_descriptions,
+)
+
+# Request handler modules each import the application, which imports all of
+# them; handlers from other modules are looked up when they are called, so
+# that these modules may be imported in any order
+import web.directions
+import web.ingredients
+
+
+def validate_recipe(recipe):
+    if not isinstance(recipe, dict):
+        raise ValueError(f"Invalid recipe: {recipe!r}")
+    for field in ("ingredients", "directions"):
+        if not valid_descriptions(recipe.get(field, [])):
+            raise ValueError(f"Invalid recipe {field}: {recipe[field]!r}")
+    return recipe
+
+
+def read_recipe():
+    # A single recipe may be provided in a JSON document, or as form-encoded
+    # fields
+    if request.is_json:
+        try:
+            return validate_recipe(request.get_json(silent=True))
+        except ValueError:
+            return abort(400)
+    return {
+        "ingredients": request.form.getlist("ingredients[]"),
+        "directions": request.form.getlist("directions[]"),
+    }
+
+
+def query_recipe(recipe, state, stats):
+    ingredients = recipe.get("ingredients", [])
+    directions = recipe.get("directions", [])
+    return {
+        "ingredients": dict(
+            web.ingredients.query_ingredients(ingredients, state, stats)
+        ),
+        "directions": list(web.directions.query_directions(directions)),
+    }
+
+
+def query_ndjson(stream, state, stats):
+    # Each line is queried independently, and an invalid recipe is reported in
+    # place of its result, since earlier results may already have been sent
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            recipe = validate_recipe(json.loads(line))
+        except ValueError as e:
+            yield {"error": str(e)}
+            continue
+        yield query_recipe(recipe, state, stats)
+
+
+@app.route("/recipes/query", methods=["POST"])
+def recipes():
+    # Recipes may be provided as newline-delimited JSON objects, or as a single
+    # recipe in a JSON document or form-encoded fields
+    if request.mimetype == NDJSON:
+        state = app.graph_refresher.current()
+        return stream_results(query_ndjson(request.stream, state, Counter()))
+
+    recipe = read_recipe()
+    state = app.graph_refresher.current()
+    return jsonify(query_recipe(recipe, state, Counter()))
@@ -0,0 +1,106 @@
+from collections import namedtuple
+from datetime import UTC, datetime, timedelta
+from itertools import count
+from threading import Lock, Thread
+from traceback import print_exc
+
+
+# An immutable snapshot of a graph, the time that it was loaded, and a version
+# number that changes with each load; readers should take a single reference to
+# the state and use it for their duration
+GraphState = namedtuple("GraphState", ["graph", "loaded_at", "version"])
+
+# The number of consecutive failed builds, and the time of the latest of them
+Failures = namedtuple("Failures", ["count", "failed_at"])
+
+# Versions are unique within the process, even across refreshers
+versions = count(1)
+
+
+class GraphUnavailable(Exception):
+    pass
+
+
+class GraphRefresher:
+    def __init__(
+        self, build, max_age=timedelta(hours=1), retry_delay=timedelta(seconds=30)
+    ):
+        self.build = build
+        self.max_age = max_age
+        self.retry_delay = retry_delay
+        self.state = None
+        self.lock = Lock()
+        self.failures = None
+
+    def expired(self, state):
+        if state is None:
+            return True
+        return datetime.now(tz=UTC) >= state.loaded_at + self.max_age
+
+    def retry_at(self, failures=None):
+        # After consecutive failed builds, wait exponentially longer before
+        # retrying, for at most the maximum age of a graph
+        failures = failures or self.failures
+        if failures is None:
+            return None
+        backoff = 2 ** min(failures.count - 1, 16)
+        return failures.failed_at + min(self.retry_delay * backoff, self.max_age)
+
+    def backing_off(self):
+        retry_at = self.retry_at()
+        return retry_at is not None and datetime.now(tz=UTC) < retry_at
+
+    def current(self):
+        state = self.state
+
+        # Block until an initial graph is available; there is nothing to serve
+        if state is None:
+            return self.refresh()
+
+        # Continue serving the existing graph while a replacement is built
+        if self.expired(state):
+            self.refresh_in_background()
+        return state
+
+    def refresh(self):
+        # Concurrent callers queue on the lock; once the first of them has
+        # completed a build, the others find a fresh state and return it, and
+        # once a build has failed, they do not retry until the backoff expires
+        with self.lock:
+            if not self.expired(self.state):
+                return self.state
+            if self.backing_off():
+                raise GraphUnavailable(f"Graph build retry at {self.retry_at()}")
+            previous = self.state.graph if self.state else None
+            try:
+                graph = self.build(previous)
+            except Exception:
+                count = self.failures.count if self.failures else 0
+                self.failures = Failures(count + 1, datetime.now(tz=UTC))
+                raise
+            self.failures = None
+
+            # An unchanged graph retains its version, so that results cached
+            # for that version continue to be used
+            unchanged = self.state and graph is self.state.graph
+            self.state = GraphState(
+                graph=graph,
+                loaded_at=datetime.now(tz=UTC),
+                version=self.state.version if unchanged else next(versions),
+            )
+            return self.state
+
+    def refresh_in_background(self):
+        if self.lock.locked() or self.backing_off():
+            return
+        thread = Thread(target=self._background_refresh, daemon=True)
+        thread.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except GraphUnavailable:
+            pass
+        except Exception:
+            print("Background graph refresh failed; continuing with previous graph")
+            print_exc()
@@ -0,0 +1,11 @@
+from snowballstemmer import stemmer
+
+from web.cache import LRUCache, StemCache
+from web.models.product import Product
+
+# Caches shared by request handlers, and reported by the status endpoints;
+# this module does not import the application, so that the handlers and the
+# status endpoints can each import it regardless of import order
+product_stems = Product.stemmer.stems
+equipment_stems = StemCache(stemmer("english").stemWord)
+ingredient_results = LRUCache(maxsize=10000)
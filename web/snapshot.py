@@ -0,0 +1,114 @@
+from glob import glob
+from hashlib import sha256
+import errno
+import os
+import pickle
+import sys
+from time import perf_counter
+
+from web.loader import CACHE_PATHS
+
+SNAPSHOT_VERSION = 5
+
+
+class BoundedWriter:
+    def __init__(self, f, max_bytes):
+        self.f = f
+        self.max_bytes = max_bytes
+        self.written = 0
+
+    def write(self, data):
+        # Fail before the limit is exceeded, rather than once storage is full
+        self.written += len(data)
+        if self.written > self.max_bytes:
+            raise OSError(errno.EFBIG, f"Snapshot exceeds {self.max_bytes} bytes")
+        return self.f.write(data)
+
+
+def save_snapshot(graph, filename, max_bytes=None):
+    print(f"Writing graph snapshot to {filename}")
+    partial = f"{filename}.{os.getpid()}.partial"
+    try:
+        with open(partial, "wb") as f:
+            writer = BoundedWriter(f, max_bytes) if max_bytes else f
+            data = SNAPSHOT_VERSION, graph
+            pickle.dump(data, writer, protocol=pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    # Replace any previous snapshot atomically so that readers never see a
+    # partially-written file
+    os.replace(partial, filename)
+
+
+def load_snapshot(filename):
+    if not os.path.exists(filename):
+        raise RuntimeError(f"Could not read graph snapshot from: {filename}")
+
+    print(f"Reading graph snapshot from {filename}")
+    with open(filename, "rb") as f:
+        version, graph = pickle.load(f)
+
+    if version != SNAPSHOT_VERSION:
+        raise RuntimeError(f"Unsupported graph snapshot version: {version}")
+    return graph
+
+
+def snapshot_validators(filename):
+    # Identify the content of a snapshot file without reading it; snapshots
+    # are replaced rather than rewritten, so a change of file is detected
+    stat = os.stat(filename)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def graph_digest(products, stopwords):
+    digest = sha256(f"snapshot-v{SNAPSHOT_VERSION}\n".encode())
+    for product in products:
+        digest.update(f"{product!r}\n".encode())
+    for stopword in stopwords:
+        digest.update(f"{stopword}\n".encode())
+    with open(CACHE_PATHS["clearwords"], "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_filename(directory, digest):
+    return os.path.join(directory, f"product-graph-{digest}.snapshot")
+
+
+def load_cached_snapshot(directory, digest):
+    filename = cache_filename(directory, digest)
+    if not os.path.exists(filename):
+        print(f"Graph cache miss: {filename}")
+        return None
+
+    started = perf_counter()
+    try:
+        graph = load_snapshot(filename)
+    except Exception as e:
+        print(f"Graph cache miss: could not load {filename}: {e}")
+        return None
+    print(f"Graph cache hit: loaded {filename} in {perf_counter() - started:.2f}s")
+    return graph
+
+
+def save_cached_snapshot(graph, directory, digest, max_bytes=None):
+    # Discard snapshots of previous hierarchies before writing, so that cache
+    # storage holds at most a single snapshot; the cache is an optimization,
+    # so failing to write to it is not an error
+    filename = cache_filename(directory, digest)
+    try:
+        for previous in glob(cache_filename(directory, "*")):
+            if previous != filename:
+                os.remove(previous)
+        save_snapshot(graph, filename, max_bytes)
+    except Exception as e:
+        print(f"Graph cache write failed: could not save {filename}: {e}")
+
+
+if __name__ == "__main__":
+    from web.ingredients import build_product_graph
+
+    save_snapshot(build_product_graph(), sys.argv[1])
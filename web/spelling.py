@@ -0,0 +1,113 @@
+from collections import defaultdict
+from itertools import pairwise
+
+# Words shorter than this are never corrected, since too many other words lie
+# within a small edit distance of them
+MIN_LENGTH = 5
+
+
+def read_dictionary(filename):
+    words = set()
+    with open(filename) as f:
+        for line in f.readlines():
+            if line.startswith("#") or not line.strip():
+                continue
+            words.add(line.strip().lower())
+    return frozenset(words)
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance: insertions, deletions, substitutions
+    # and transpositions of adjacent characters; returns limit + 1 once the
+    # distance is known to exceed the limit, so only cells within the limit of
+    # the diagonal are computed
+    exceeded = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return exceeded
+    before, previous = None, [min(j, exceeded) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [exceeded] * (len(b) + 1)
+        current[0] = min(i, exceeded)
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+                exceeded,
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit and min(previous) > limit:
+            return exceeded
+        before, previous = previous, current
+    return previous[len(b)]
+
+
+def deletes(word, distance):
+    # Generate the variants of a word with up to the given number of characters
+    # deleted, including the word itself
+    variants, frontier = {word}, {word}
+    for _ in range(distance):
+        frontier = {
+            variant[:start] + variant[end:]
+            for variant in frontier
+            for start, end in pairwise(range(len(variant) + 1))
+        }
+        variants |= frontier
+    return variants
+
+
+class SpellingIndex:
+    def __init__(self, frequencies, ignored=(), max_distance=2, prefix_length=7):
+        # Map the deletion variants of each word prefix to the words that they
+        # derive from, so that lookups only compare words that share a variant
+        # with the query
+        self.frequencies = dict(frequencies)
+        self.ignored = frozenset(ignored)
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.variants = defaultdict(list)
+        for word in self.frequencies:
+            prefix = word[:prefix_length]
+            for variant in deletes(prefix, max_distance):
+                self.variants[variant].append(word)
+        self.variants = {
+            variant: tuple(words) for variant, words in self.variants.items()
+        }
+
+    def allowed_distance(self, word):
+        return 1 if len(word) < 8 else self.max_distance
+
+    def lookup(self, word):
+        # Return the nearest known word, preferring more-frequent words among
+        # equally-near ones; known, ignored and short words are not corrected
+        if word in self.frequencies or word in self.ignored:
+            return None
+        if len(word) < MIN_LENGTH or not word.isalpha():
+            return None
+
+        limit = self.allowed_distance(word)
+        candidates = set()
+        for variant in deletes(word[: self.prefix_length], limit):
+            candidates.update(self.variants.get(variant, ()))
+
+        best = None
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, limit)
+            if distance > limit:
+                continue
+            rank = distance, -self.frequencies[candidate], candidate
+            if best is None or rank < best:
+                best = rank
+        return best[2] if best else None
+
+    def correct(self, stems, words=None, dictionary=frozenset()):
+        # Correct the stems of misspelt words; words that are found in the
+        # dictionary, as written or by their stem, are not misspellings
+        corrected = []
+        for word, stem in zip(stems if words is None else words, stems):
+            if word not in dictionary and stem not in dictionary:
+                stem = self.lookup(stem) or stem
+            corrected.append(stem)
+        return corrected
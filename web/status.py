@@ -0,0 +1,104 @@
+from datetime import UTC, datetime
+from flask import Response, jsonify
+
+from web.app import app
+from web.shared_caches import equipment_stems, ingredient_results, product_stems
+from web.metrics import render
+from web.refresh import GraphUnavailable
+
+
+def hit_rate(stats):
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else None
+
+
+def graph_age(state):
+    return (datetime.now(tz=UTC) - state.loaded_at).total_seconds()
+
+
+def graph_status(refresher):
+    state, failures = refresher.state, refresher.failures
+    if not state and failures:
+        return {"status": "unavailable", **failure_status(refresher, failures)}
+    if not state:
+        return {"status": "loading"}
+    return {
+        "status": "ready",
+        "version": state.version,
+        "loaded_at": state.loaded_at.isoformat(),
+        "age": graph_age(state),
+        "products": len(state.graph.products_by_id),
+        **failure_status(refresher, failures),
+    }
+
+
+def failure_status(refresher, failures):
+    # Report consecutive failed builds, and when the next may be attempted
+    if not failures:
+        return {}
+    return {
+        "failures": failures.count,
+        "failed_at": failures.failed_at.isoformat(),
+        "retry_at": refresher.retry_at(failures).isoformat(),
+    }
+
+
+@app.errorhandler(GraphUnavailable)
+def graph_unavailable(error):
+    # Requests fail fast while builds are retried after a failed build
+    return jsonify(graph_status(app.graph_refresher)), 503
+
+
+@app.route("/ready")
+def ready():
+    # Workers are ready once a graph is available; a graph is loaded in the
+    # background when one has not been preloaded at startup
+    if not app.graph_refresher.state:
+        app.graph_refresher.refresh_in_background()
+        return jsonify(graph_status(app.graph_refresher)), 503
+    return jsonify(graph_status(app.graph_refresher))
+
+
+@app.route("/live")
+def live():
+    # Liveness only requires a responsive worker, including while it loads
+    return jsonify(graph_status(app.graph_refresher))
+
+
+@app.route("/caches")
+def caches():
+    return jsonify(
+        {
+            "ingredient_results": ingredient_results.stats(),
+            "product_stems": product_stems.stats(),
+            "equipment_stems": equipment_stems.stats(),
+        }
+    )
+
+
+@app.route("/metrics")
+def metrics():
+    # Report on the graph currently being served, without loading one
+    state = app.graph_refresher.state
+    age = products = None
+    if state:
+        age = graph_age(state)
+        products = len(state.graph.products_by_id)
+
+    gauges = {
+        "graph_age_seconds": ("Time since the product graph was loaded", age),
+        "graph_products": ("Number of products in the graph", products),
+        "ingredient_result_cache_hit_rate": (
+            "Hit rate of the ingredient result cache",
+            hit_rate(ingredient_results.stats()),
+        ),
+        "product_stem_cache_hit_rate": (
+            "Hit rate of the product stem cache",
+            hit_rate(product_stems.stats()),
+        ),
+        "equipment_stem_cache_hit_rate": (
+            "Hit rate of the equipment stem cache",
+            hit_rate(equipment_stems.stats()),
+        ),
+    }
+    return Response(render(gauges), mimetype="text/plain; version=0.0.4")
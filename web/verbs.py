@@ -0,0 +1,135 @@
+from threading import Lock
+
+from web.matching import stem, tokenize
+
+# Punctuation that ends a sentence or clause; a verb that follows it begins a
+# new instruction, as does a verb that follows "then"
+CLAUSE_PUNCTUATION = set(";:.!?")
+SEQUENCE_WORDS = {"then"}
+
+# Conjunctions also join the items of ingredient lists, many of which share
+# their names with verbs (cream, zest, top); a verb that follows a conjunction
+# only begins an instruction when it is followed by the start of its object
+CONJUNCTIONS = {"and", "or"}
+OBJECT_WORDS = {
+    "a",
+    "all",
+    "an",
+    "any",
+    "each",
+    "everything",
+    "half",
+    "it",
+    "some",
+    "the",
+    "them",
+    "these",
+    "this",
+    "those",
+    "your",
+}
+
+
+def read_verbs(filename):
+    verbs = []
+    with open(filename) as f:
+        for line in f.readlines():
+            if line.startswith("#") or not line.strip():
+                continue
+            verbs.append(line.strip().lower())
+    return verbs
+
+
+def load_model(name):
+    # Part-of-speech tagging is an optional capability; the spaCy package and
+    # its language model are not installed by default
+    try:
+        import spacy
+    except ImportError:
+        return None
+    try:
+        return spacy.load(name, disable=["parser", "ner", "lemmatizer"])
+    except OSError:
+        print(f"Could not load language model: {name}")
+        return None
+
+
+class VerbLexicon:
+    def __init__(self, verbs, stemmer):
+        self.stemmer = stemmer
+        self.verbs = frozenset(verbs)
+        self.stems = frozenset(
+            stems[0]
+            for stems in (stem(tokenize(verb), stemmer) for verb in verbs)
+            if len(stems) == 1
+        )
+
+    def begins_clause(self, description, tokens, index):
+        if index == 0:
+            return True
+        previous, token = tokens[index - 1], tokens[index]
+        start, end = previous.end, token.start
+        separator = description[start:end]
+        if CLAUSE_PUNCTUATION & set(separator):
+            return True
+        if previous.text in SEQUENCE_WORDS:
+            return True
+        if previous.text in CONJUNCTIONS and index + 1 < len(tokens):
+            following = tokens[index + 1]
+            start, end = token.end, following.start
+            separator = description[start:end]
+            return following.text in OBJECT_WORDS and not separator.strip()
+        return False
+
+    def imperative(self, token):
+        # Present participles share their stems with imperative verbs, but in
+        # recipe instructions they qualify nouns (frying pan, measuring cup)
+        return not token.text.endswith("ing") or token.text in self.verbs
+
+    def spans(self, description, tokens):
+        # Recipe instructions are written in the imperative mood, so known
+        # verbs are recognised where they begin a clause; commas alone do not
+        # separate clauses, since they also separate the items of lists
+        stems = stem([token.text for token in tokens], self.stemmer)
+        for index, (token, token_stem) in enumerate(zip(tokens, stems)):
+            if token_stem not in self.stems or not self.imperative(token):
+                continue
+            if self.begins_clause(description, tokens, index):
+                start, end = token.start, token.end
+                yield start, end, description[start:end]
+
+
+class VerbExtractor:
+    def __init__(self, lexicon, model_name):
+        self.lexicon = lexicon
+        self.model_name = model_name
+        self.model = None
+        self.loaded = False
+        self.lock = Lock()
+
+    def load(self):
+        # Load the language model at most once per process, on first use
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.model = load_model(self.model_name)
+                    self.loaded = True
+        return self.model
+
+    def extract(self, descriptions, analyses):
+        # Return the (start, end, text) spans of the verbs in each description;
+        # descriptions are tagged together, in a single pass through the model
+        model = self.load()
+        if model is None:
+            return [
+                list(self.lexicon.spans(description, tokens))
+                for description, tokens in zip(descriptions, analyses)
+            ]
+        return [
+            [
+                (token.idx, token.idx + len(token.text), token.text)
+                for token in doc
+                if token.pos_ == "VERB"
+            ]
+            for doc in model.pipe(descriptions)
+        ]